@@ -0,0 +1,277 @@
+""" Append only store for the equity curves of many backtest runs.
+
+Runs are partitioned on disk by strategy name:
+
+    <path>/strategy=<name>/runs.jsonl          metadata log, one line per run
+    <path>/strategy=<name>/runs.columns.json   the same metadata, one list per field
+    <path>/strategy=<name>/columns/            equity curves of every run, one file per column
+
+Appending a run adds a line to the log and a segment of rows to the column
+files, so the number of files does not grow with the number of runs. Queries
+filter the columnar metadata with array operations, after adding any new
+lines of the log to it, and only read the requested columns of the matching
+runs, through a memory map.
+"""
+import json
+import operator
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from quant_testing.core.cache import object_params, data_fingerprint
+from quant_testing.core.storage import ColumnSegments
+
+METADATA_FILE = 'runs.jsonl'
+COLUMNAR_METADATA_FILE = 'runs.columns.json'
+SEGMENTS_DIR = 'columns'
+PARTITION_PREFIX = 'strategy='
+OPERATORS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt,
+             '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+             'in': lambda value, options: value in options}
+
+# Fields of the metadata locating the equity curve of a run in the column files
+LOCATION_FIELDS = ('rows', 'offsets')
+
+
+def _flatten(run, prefix=''):
+    """ Flatten nested dicts of metadata into 'parent.name' fields
+    """
+    flat = {}
+    for name, value in run.items():
+        if isinstance(value, dict) and value:
+            flat.update(_flatten(value, prefix + name + '.'))
+        else:
+            flat[prefix + name] = value
+    return flat
+
+
+def _unflatten(flat):
+    """ Rebuild the metadata of a run from its flattened fields, skipping missing ones
+    """
+    run = {'params': {}}
+    for name, value in flat.items():
+        if value is None:
+            continue
+        *parents, leaf = name.split('.')
+        node = run
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    return run
+
+
+def _field(metadata, name):
+    """ Values of a field in the strategy parameters, or else in the metadata
+    """
+    values = None
+    for column in ('params.' + name, name):
+        if column in metadata:
+            field = metadata[column]
+            values = field if values is None else values.where(values.notna(), field)
+    return values
+
+
+def _matches(metadata, filters):
+    """ Boolean mask of the runs whose metadata satisfies every filter
+    """
+    mask = np.ones(len(metadata), dtype=bool)
+    for name, op, value in filters:
+        if op not in OPERATORS:
+            raise ValueError("Unknown operator {}".format(op))
+        field = _field(metadata, name)
+        if field is None:
+            return np.zeros(len(metadata), dtype=bool)
+
+        present = field.notna().to_numpy()
+        values = field[present].astype(object)
+        try:
+            if op == 'in':
+                result = values.isin(value)
+            else:
+                result = OPERATORS[op](values, value)
+            result = np.asarray(result, dtype=bool)
+        except (TypeError, ValueError):
+            # Fields of mixed or non scalar types are compared one run at a time
+            result = np.array([bool(OPERATORS[op](field_value, value)) for field_value in values],
+                              dtype=bool)
+
+        matched = np.zeros(len(metadata), dtype=bool)
+        matched[present] = result
+        mask &= matched
+    return mask
+
+
+class ResultsStore:
+    """ Partitioned, columnar store of backtest equity curves.
+
+    Parameters
+    ----------
+    path: str
+        Directory of the store. Created if it does not exist.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def strategies(self):
+        return sorted(name[len(PARTITION_PREFIX):] for name in os.listdir(self.path)
+                      if name.startswith(PARTITION_PREFIX))
+
+    def append(self, eq_curve, strategy, params=None, data_id=None, **metadata):
+        """ Append the equity curve of a run to the store
+
+        Parameters
+        ----------
+        eq_curve: pandas.DataFrame
+            Equity curve, as returned by Simulator.backtest
+        strategy: str
+            Name of the strategy, used to partition the store
+        params: dict, optional
+            Parameters of the strategy
+        data_id: str, optional
+            Identifier of the data the strategy was run on
+        metadata:
+            Any other json serialisable information about the run
+
+        Returns
+        -------
+        str
+            Identifier of the run
+
+        """
+        run_id = uuid.uuid4().hex
+        partition = self._partition_path(strategy)
+        offsets = ColumnSegments(os.path.join(partition, SEGMENTS_DIR)).append(eq_curve)
+
+        run = dict(metadata, run_id=run_id, strategy=strategy,
+                   params=params or {}, data_id=data_id,
+                   rows=len(eq_curve), offsets=offsets)
+        with open(os.path.join(partition, METADATA_FILE), 'a') as metadata_file:
+            metadata_file.write(json.dumps(run) + '\n')
+        return run_id
+
+    def append_simulation(self, simulator, eq_curve, **metadata):
+        """ Append the result of a simulator, recording its strategy and data
+        """
+        strategy = simulator.strategy
+        data_id = data_fingerprint(simulator.datahandler)['content']
+        params = object_params(strategy)
+        return self.append(eq_curve, type(strategy).__name__, params=params,
+                           data_id=data_id, **metadata)
+
+    def runs(self, strategy=None, filters=()):
+        """ Get the metadata of the runs matching the filters
+
+        Parameters
+        ----------
+        strategy: str, optional
+            Only look in the partition of this strategy. If None, look in all.
+        filters: list, optional
+            List of (name, operator, value) tuples, e.g. [('long_window', '>', 50)].
+            Names are looked up in the strategy parameters, then in the metadata.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per run, with the parameters expanded into columns
+
+        """
+        frames = []
+        for name in self._strategies(strategy):
+            _, metadata = self._metadata(name)
+            frames.append(metadata[_matches(metadata, filters)])
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=['run_id', 'strategy', 'data_id'])
+
+        runs = pd.concat(frames, ignore_index=True)
+        location = [col for col in runs.columns if col.split('.')[0] in LOCATION_FIELDS]
+        return runs.drop(columns=location).set_index('run_id', drop=False)
+
+    def iter_runs(self, strategy=None, filters=(), columns=None, mmap_mode='r'):
+        """ Iterate over the matching runs, yielding (metadata, eq_curve)
+
+        Only the requested columns of the matching runs are read, and by
+        default they are read through a memory map.
+        """
+        for name in self._strategies(strategy):
+            values, metadata = self._metadata(name)
+            segments = ColumnSegments(os.path.join(self._partition_path(name), SEGMENTS_DIR))
+            for position in np.flatnonzero(_matches(metadata, filters)):
+                run = _unflatten({field: field_values[position]
+                                  for field, field_values in values.items()})
+                offsets = run.pop('offsets')
+                rows = run.pop('rows')
+                yield run, segments.read(offsets, rows, columns=columns, mmap_mode=mmap_mode)
+
+    def load(self, strategy=None, filters=(), columns=None):
+        """ Load the equity curves of the matching runs into a single dataframe
+
+        Returns
+        -------
+        pandas.DataFrame
+            Equity curves indexed by (run_id, date)
+
+        """
+        run_ids = []
+        frames = []
+        for run, eq_curve in self.iter_runs(strategy, filters, columns):
+            run_ids.append(run['run_id'])
+            frames.append(eq_curve)
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, keys=run_ids, names=['run_id', frames[0].index.name])
+
+    def _strategies(self, strategy):
+        return self.strategies if strategy is None else [strategy]
+
+    def _metadata(self, strategy):
+        """ Metadata of the runs of a partition, one column per flattened field
+
+        The columns are read from the columnar metadata file, and any runs
+        appended to the log since it was written are added and saved to it.
+        Returns both the json values of each field and a dataframe of them.
+        """
+        partition = self._partition_path(strategy)
+        columnar_path = os.path.join(partition, COLUMNAR_METADATA_FILE)
+        if os.path.exists(columnar_path):
+            with open(columnar_path) as columnar_file:
+                columnar = json.load(columnar_file)
+        else:
+            columnar = {'log_size': 0, 'runs': 0, 'columns': {}}
+
+        metadata_path = os.path.join(partition, METADATA_FILE)
+        new_lines = b''
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'rb') as metadata_file:
+                metadata_file.seek(columnar['log_size'])
+                new_lines = metadata_file.read()
+            # Only complete lines, a run may be being appended
+            new_lines = new_lines[:new_lines.rfind(b'\n') + 1]
+
+        if new_lines:
+            columns = columnar['columns']
+            for line in new_lines.decode().splitlines():
+                run = _flatten(json.loads(line))
+                for name in run:
+                    if name not in columns:
+                        columns[name] = [None] * columnar['runs']
+                for name, values in columns.items():
+                    values.append(run.get(name))
+                columnar['runs'] += 1
+            columnar['log_size'] += len(new_lines)
+            with open(columnar_path, 'w') as columnar_file:
+                json.dump(columnar, columnar_file)
+
+        metadata = pd.DataFrame({name: pd.Series(values, dtype=object)
+                                 for name, values in columnar['columns'].items()},
+                                index=pd.RangeIndex(columnar['runs']))
+        return columnar['columns'], metadata.infer_objects()
+
+    def _partition_path(self, strategy):
+        return os.path.join(self.path, PARTITION_PREFIX + str(strategy))
@@ -0,0 +1,183 @@
+""" Performance metrics accumulated bar by bar, during a simulation.
+
+Each accumulator is updated in constant time and memory, so the metrics of a
+long or live run can be reported at any point without keeping the equity
+curve.
+"""
+import math
+
+from quant_testing.core.events import ExecutionType
+
+
+class RunningMoments:
+    """ Running mean and variance, with Welford's algorithm
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        """ Sample variance, with one degree of freedom as in pandas
+        """
+        if self.count < 2:
+            return math.nan
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class RunningDrawdown:
+    """ Running high water mark and maximum drawdown of an equity value
+    """
+
+    def __init__(self):
+        self.high_water_mark = None
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+
+    def update(self, value):
+        if self.high_water_mark is None or value >= self.high_water_mark:
+            self.high_water_mark = value
+            self.drawdown = 0.0
+        else:
+            self.drawdown = (self.high_water_mark - value) / self.high_water_mark
+        self.max_drawdown = max(self.max_drawdown, self.drawdown)
+
+
+class TradeStats:
+    """ Running statistics of the fills of a single share portfolio
+
+    A round trip is closed when a sell fill takes the position back to zero,
+    and its profit is the proceeds less the cost of the shares, commissions included.
+    """
+
+    def __init__(self):
+        self.fills = 0
+        self.commission = 0.0
+        self.round_trips = 0
+        self.winning_trips = 0
+        self.total_profit = 0.0
+
+        self._position = 0
+        self._cost = 0.0
+
+    def update(self, fill_event):
+        self.fills += 1
+        self.commission += fill_event.commission
+
+        if fill_event.direction == ExecutionType.buy:
+            self._position += fill_event.quantity
+            self._cost += fill_event.quantity * fill_event.price + fill_event.commission
+        elif fill_event.direction == ExecutionType.sell and self._position > 0:
+            fraction = min(fill_event.quantity / self._position, 1)
+            profit = (fill_event.quantity * fill_event.price - fill_event.commission
+                      - fraction * self._cost)
+            self._position -= fill_event.quantity
+            self._cost -= fraction * self._cost
+
+            self.total_profit += profit
+            if self._position <= 0:
+                self.round_trips += 1
+                self.winning_trips += profit > 0
+                self._position = 0
+                self._cost = 0.0
+
+    @property
+    def win_rate(self):
+        if not self.round_trips:
+            return math.nan
+        return self.winning_trips / self.round_trips
+
+
+class StreamingMetrics:
+    """ Performance metrics of a simulation, updated once per bar.
+
+    Parameters
+    ----------
+    N: int, optional
+        Number of trading periods in a year. Defauts to 252 (daily returns data)
+    benchmark: float, optional
+        Benchmark return to use for the Sharpe and Sortino ratios. Defaults to zero.
+
+    """
+
+    def __init__(self, N=252, benchmark=0):
+        self.N = N
+        self.benchmark = benchmark
+
+        self.returns = RunningMoments()
+        self.drawdown = RunningDrawdown()
+        self.trades = TradeStats()
+
+        self.initial_value = None
+        self.value = None
+        self._downside_sum = 0.0
+
+    def update(self, value, period_return):
+        """ Add the equity value and return of the latest bar
+        """
+        if self.initial_value is None:
+            self.initial_value = value
+        self.value = value
+
+        excess_return = period_return - self.benchmark
+        self.returns.update(excess_return)
+        self._downside_sum += min(excess_return, 0) ** 2
+        self.drawdown.update(value)
+
+    def update_fill(self, fill_event):
+        self.trades.update(fill_event)
+
+    @property
+    def sharpe_ratio(self):
+        std = self.returns.std if self.returns.count > 1 else math.nan
+        if not std:
+            return math.nan
+        return math.sqrt(self.N) * self.returns.mean / std
+
+    @property
+    def downside_deviation(self):
+        if not self.returns.count:
+            return math.nan
+        return math.sqrt(self._downside_sum / self.returns.count)
+
+    @property
+    def sortino_ratio(self):
+        downside_deviation = self.downside_deviation
+        if not downside_deviation:
+            return math.nan
+        return math.sqrt(self.N) * self.returns.mean / downside_deviation
+
+    @property
+    def total_return(self):
+        """ Total return, in percent, as in the total_return column of the equity curve
+        """
+        if not self.initial_value:
+            return math.nan
+        return 100 * (self.value - self.initial_value) / self.initial_value
+
+    def summary(self):
+        return {'periods': self.returns.count,
+                'equity_value': self.value,
+                'total_return': self.total_return,
+                'sharpe_ratio': self.sharpe_ratio,
+                'sortino_ratio': self.sortino_ratio,
+                'downside_deviation': self.downside_deviation,
+                'drawdown': self.drawdown.drawdown,
+                'max_drawdown': self.drawdown.max_drawdown,
+                'fills': self.trades.fills,
+                'commission': self.trades.commission,
+                'round_trips': self.trades.round_trips,
+                'win_rate': self.trades.win_rate,
+                'total_profit': self.trades.total_profit}
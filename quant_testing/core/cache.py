@@ -0,0 +1,291 @@
+""" Content addressed caching of backtest results and strategy signals.
+
+Results are keyed on a hash of everything that determines the outcome of a
+backtest: the input data, the source and parameters of the strategy,
+portfolio and executor, the commission function (with any values it closes
+over) and the source of the modules of this package that run a backtest. Signals are keyed on the input data
+and the strategy alone.
+"""
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import time
+import types
+
+import quant_testing
+from .storage import write_frame, read_frame, frame_size
+
+INDEX_NAME = 'index.json'
+PARAM_TYPES = (int, float, str, bool, type(None), tuple)
+
+# Modules whose code determines the equity curve of a backtest
+BACKTEST_MODULES = ('quant_testing.analytics.streaming_metrics',
+                    'quant_testing.core.datahandler',
+                    'quant_testing.core.defaults',
+                    'quant_testing.core.events',
+                    'quant_testing.core.execution',
+                    'quant_testing.core.indicators',
+                    'quant_testing.core.portfolio',
+                    'quant_testing.core.simulation',
+                    'quant_testing.core.storage',
+                    'quant_testing.core.strategy')
+
+
+def object_params(obj, exclude=()):
+    """ Get the simple (hashable, printable) attributes of an object
+
+    Attributes such as the events queue or the portfolio are skipped, as they
+    are not parameters of the object.
+    """
+    return {name: value for name, value in sorted(vars(obj).items())
+            if name not in exclude and isinstance(value, PARAM_TYPES)}
+
+
+def _code_fingerprint(code):
+    """ Hash compiled code, including any nested functions it defines
+    """
+    digest = hashlib.sha256(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            digest.update(_code_fingerprint(const).encode())
+        else:
+            digest.update(repr(const).encode())
+    digest.update(repr(code.co_names).encode())
+    return digest.hexdigest()
+
+
+def _value_fingerprint(value, seen):
+    if callable(value) and not isinstance(value, type):
+        return function_fingerprint(value, seen)
+    return repr(value)
+
+
+def function_fingerprint(func, _seen=None):
+    """ Identify a function by its name, its compiled code, and the values it closes over
+
+    Default arguments, closure cells and the arguments bound by functools.partial
+    are all included, so functions made by the same factory with different
+    arguments have different fingerprints.
+    """
+    name = "{}.{}".format(getattr(func, '__module__', None),
+                          getattr(func, '__qualname__', type(func).__qualname__))
+
+    # Recursive closures refer back to themselves, so only hash each function once
+    seen = set() if _seen is None else _seen
+    if id(func) in seen:
+        return name
+    seen.add(id(func))
+
+    if isinstance(func, functools.partial):
+        bound = [_value_fingerprint(arg, seen) for arg in func.args]
+        bound += ["{}={}".format(key, _value_fingerprint(value, seen))
+                  for key, value in sorted(func.keywords.items())]
+        return "partial({}, {})".format(function_fingerprint(func.func, seen), ", ".join(bound))
+
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return name
+
+    digest = hashlib.sha256(_code_fingerprint(code).encode())
+    for value in func.__defaults__ or ():
+        digest.update(_value_fingerprint(value, seen).encode())
+    for key, value in sorted((func.__kwdefaults__ or {}).items()):
+        digest.update("{}={}".format(key, _value_fingerprint(value, seen)).encode())
+    for cell in func.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:
+            # The cell of a closure variable that has not been assigned yet
+            continue
+        digest.update(_value_fingerprint(contents, seen).encode())
+    return name + digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def class_fingerprint(cls):
+    """ Identify a class by its name and the source of every class it inherits from
+    """
+    digest = hashlib.sha256()
+    for parent in cls.__mro__:
+        if parent is object:
+            continue
+        try:
+            digest.update(inspect.getsource(parent).encode())
+        except (OSError, TypeError):
+            digest.update("{}.{}".format(parent.__module__, parent.__qualname__).encode())
+    return "{}.{}:{}".format(cls.__module__, cls.__qualname__, digest.hexdigest())
+
+
+@functools.lru_cache(maxsize=None)
+def package_fingerprint():
+    """ Hash the source of the BACKTEST_MODULES, and the version of the package
+    """
+    digest = hashlib.sha256(quant_testing.__version__.encode())
+    for name in BACKTEST_MODULES:
+        digest.update(inspect.getsource(importlib.import_module(name)).encode())
+    return digest.hexdigest()
+
+
+def data_fingerprint(datahandler):
+    """ Identify the data of a datahandler by its symbol and content
+
+    The content is the data_id of the handler, which hashes its data once.
+    Raises a ValueError for handlers without any data to identify, whose
+    results can not be cached.
+    """
+    content = getattr(datahandler, 'data_id', None)
+    if content is None:
+        raise ValueError("Can not identify the data of {}, its results can not be cached"
+                         .format(type(datahandler).__name__))
+    return {'symbol': str(getattr(datahandler, 'symbol', None)), 'content': content}
+
+
+class BacktestCache:
+    """ Cache of backtest equity curves, stored on disk as numpy columns.
+
+    Entries are evicted in least recently used order once the total size on
+    disk exceeds max_bytes.
+
+    Parameters
+    ----------
+    path: str
+        Directory to store the cache in
+    max_bytes: int, optional
+        Maximum size of the cache on disk. Defaults to 1GB.
+
+    """
+
+    def __init__(self, path, max_bytes=2**30):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(path, exist_ok=True)
+        self._index = self._read_index()
+
+    @property
+    def size(self):
+        return sum(entry['size'] for entry in self._index.values())
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def make_key(self, simulator, finish):
+        """ Build the cache key of a backtest run by simulator up to finish
+
+        This must be called before the simulation is run, as it uses the
+        current state of the portfolio.
+        """
+        portfolio = simulator.portfolio
+        strategy = simulator.strategy
+        description = {
+            'code': package_fingerprint(),
+            'finish': str(finish),
+            'data': data_fingerprint(simulator.datahandler),
+            'strategy': [class_fingerprint(type(strategy)), object_params(strategy)],
+            'portfolio': [class_fingerprint(type(portfolio)), object_params(portfolio)],
+            'commission': function_fingerprint(portfolio.commission),
+            'execution': class_fingerprint(type(simulator.execution_handler)),
+        }
+        encoded = json.dumps(description, sort_keys=True, default=repr).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key):
+        """ Get the equity curve stored under key, or None if it is not cached
+        """
+        if key not in self._index:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._index[key]['last_access'] = time.time()
+        self._write_index()
+        return read_frame(self._entry_path(key))
+
+    def put(self, key, eq_curve):
+        """ Store an equity curve under key, evicting old entries if needed
+        """
+        entry_path = self._entry_path(key)
+        if os.path.exists(entry_path):
+            shutil.rmtree(entry_path)
+        write_frame(entry_path, eq_curve)
+        self._index[key] = {'size': frame_size(entry_path), 'last_access': time.time()}
+        self._evict()
+        self._write_index()
+
+    def clear(self):
+        for key in list(self._index):
+            self._remove(key)
+        self._write_index()
+
+    def _evict(self):
+        """ Remove the least recently used entries until the cache fits in max_bytes
+        """
+        by_access = sorted(self._index, key=lambda key: self._index[key]['last_access'])
+        for key in by_access:
+            if self.size <= self.max_bytes:
+                break
+            self._remove(key)
+
+    def _remove(self, key):
+        shutil.rmtree(self._entry_path(key), ignore_errors=True)
+        del self._index[key]
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key)
+
+    def _read_index(self):
+        index_path = os.path.join(self.path, INDEX_NAME)
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path) as index_file:
+            return json.load(index_file)
+
+    def _write_index(self):
+        index_path = os.path.join(self.path, INDEX_NAME)
+        with open(index_path, 'w') as index_file:
+            json.dump(self._index, index_file)
+
+
+class SignalCache:
+    """ In memory cache of precomputed strategy signals.
+
+    Signals are keyed on the data of the handler and the strategy class and
+    parameters, so they are shared between runs that only differ in their
+    portfolio, commission or execution.
+
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._signals = {}
+
+    def __len__(self):
+        return len(self._signals)
+
+    def make_key(self, strategy, datahandler):
+        description = {
+            'data': data_fingerprint(datahandler),
+            'strategy': [class_fingerprint(type(strategy)), object_params(strategy)],
+        }
+        return json.dumps(description, sort_keys=True, default=repr)
+
+    def get_signals(self, strategy, datahandler):
+        """ Get the signals of strategy over the data of datahandler, computing them if needed
+        """
+        key = self.make_key(strategy, datahandler)
+        if key in self._signals:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._signals[key] = strategy.precompute_signals(datahandler.data)
+        return self._signals[key]
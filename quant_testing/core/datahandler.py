@@ -1,14 +1,24 @@
 from abc import ABCMeta, abstractmethod
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import quandl
 import configparser
-from datetime import datetime
 from .events import MarketEvent
+from .indicators import IndicatorRegistry
+from .panel_loader import read_panel
+from .storage import fingerprint_data, fingerprint_panel
 
 logger = "AlgoTrading.log"
 CONFIG_LOC = '/home/elliot/.config/personal/common.ini'
 
 
+def _to_nanoseconds(timestamps):
+    """ Convert timestamps to an array of int64 nanoseconds
+    """
+    return np.asarray(pd.DatetimeIndex(timestamps).values.astype('datetime64[ns]')).view('int64')
+
+
 # DataHandler classes
 class DataHandler:
     """
@@ -33,6 +43,86 @@ class DataHandler:
         """
         raise NotImplementedError("Should implement get_latest_bars()")
 
+    def get_latest_prices(self):
+        """ Get the latest share price as an array, empty if there are no bars yet
+        """
+        return np.asarray(self.get_latest_bars(1)['share_price'], dtype=float)
+
+
+class BarResampler:
+    """ Aggregate bars into a higher timeframe, one bar at a time.
+
+    Completed bars are kept, and only the bar in progress is updated as each
+    new bar is added.
+
+    Parameters
+    ----------
+    timeframe: str or int
+        'W' for weekly bars, 'M' for monthly bars, or an integer N for bars
+        made of every N bars.
+    columns: list
+        Names of the (numeric) columns of the bars
+
+    """
+
+    FIRST_COLUMNS = ('Open',)
+    MAX_COLUMNS = ('High',)
+    MIN_COLUMNS = ('Low',)
+    SUM_COLUMNS = ('Volume',)
+
+    def __init__(self, timeframe, columns):
+        if timeframe not in ('W', 'M') and not (isinstance(timeframe, int) and timeframe > 0):
+            raise ValueError("Unknown timeframe {}".format(timeframe))
+
+        self.timeframe = timeframe
+        self.columns = list(columns)
+        self._max = np.isin(self.columns, self.MAX_COLUMNS)
+        self._min = np.isin(self.columns, self.MIN_COLUMNS)
+        self._sum = np.isin(self.columns, self.SUM_COLUMNS)
+        self._last = ~(np.isin(self.columns, self.FIRST_COLUMNS) | self._max | self._min | self._sum)
+
+        self.completed = []
+        self.partial = None
+        self._partial_key = None
+
+        # Number of bars added so far
+        self.bar_count = 0
+
+    def _period_key(self, timestamp):
+        if self.timeframe == 'W':
+            return timestamp.isocalendar()[:2]
+        if self.timeframe == 'M':
+            return (timestamp.year, timestamp.month)
+        return self.bar_count // self.timeframe
+
+    def add(self, timestamp, bar):
+        """ Add the next bar, an array of values in the order of columns
+        """
+        key = self._period_key(timestamp)
+        self.bar_count += 1
+
+        if self.partial is None or key != self._partial_key:
+            if self.partial is not None:
+                self.completed.append(self.partial)
+            self.partial = np.array(bar, dtype=float)
+            self._partial_key = key
+            return
+
+        partial = self.partial
+        partial[self._max] = np.maximum(partial[self._max], bar[self._max])
+        partial[self._min] = np.minimum(partial[self._min], bar[self._min])
+        partial[self._sum] += bar[self._sum]
+        partial[self._last] = bar[self._last]
+
+    def latest(self, N):
+        """ Get the last N bars, including the bar in progress
+        """
+        bars = self.completed[max(len(self.completed) - N + 1, 0):] if N > 0 else []
+        if self.partial is not None and N > 0:
+            bars = bars + [self.partial]
+        return pd.DataFrame(np.array(bars).reshape(len(bars), len(self.columns)),
+                            columns=self.columns)
+
 
 class DailyHandler(DataHandler):
 
@@ -40,6 +130,11 @@ class DailyHandler(DataHandler):
 
         self.read_file(file_path)
         self.symbol = file_path
+        self.start(events, max_timestamp, current_timestamp)
+
+    def start(self, events, max_timestamp=None, current_timestamp=None):
+        """ Set up the iteration through the data, once it has been read
+        """
         self.events = events
 
         if max_timestamp is not None:
@@ -50,30 +145,146 @@ class DailyHandler(DataHandler):
         else:
             self.current_timestamp = current_timestamp
 
+        # Number of bars before the current timestamp, and the derived timeframes
+        self.cursor = self.data.index.searchsorted(self.current_timestamp, side='left')
+        self.timeframes = {}
+
+        # Indicators shared by every strategy running on this data
+        self.indicators = IndicatorRegistry(self)
+
+        # Hash of the content of the data, computed on first use
+        self._data_id = None
+
+        # Sorted int64 nanosecond timestamps and column values, for the as-of lookups
+        self.timestamps_ns = _to_nanoseconds(self.data.index)
+        self._column_values = {}
+
         # This is the point to iterate through the data
         self.data_generator = self.data.iterrows()
 
+    @property
+    def data_id(self):
+        """ Hash identifying the content of the data, computed once per handler
+        """
+        if self._data_id is None:
+            self._data_id = fingerprint_data(self.data)
+        return self._data_id
+
+    def add_timeframe(self, timeframe):
+        """ Maintain bars of a higher timeframe as the data is updated
+
+        Parameters
+        ----------
+        timeframe: str or int
+            'W' for weekly, 'M' for monthly, or an integer N for every N bars
+
+        """
+        if timeframe in self.timeframes:
+            return self.timeframes[timeframe]
+
+        numeric_data = self.data.select_dtypes('number')
+        resampler = BarResampler(timeframe, numeric_data.columns)
+        self._bar_values = numeric_data.to_numpy(dtype=float)
+        self._feed_timeframe(resampler, self.cursor)
+
+        self.timeframes[timeframe] = resampler
+        return resampler
+
+    def _feed_timeframe(self, resampler, cursor):
+        """ Add the bars before cursor that the resampler has not been given yet
+        """
+        for position in range(resampler.bar_count, cursor):
+            resampler.add(self.data.index[position], self._bar_values[position])
+
     def get_data_points(self, timestamp, N=1):
         """Get the last N data points before a particular timestamp
 
         """
-        relevant_data = self.data[self.data.index < timestamp]
-        return relevant_data.tail(N).reset_index(drop=True)
+        end = np.searchsorted(self.timestamps_ns, pd.Timestamp(timestamp).value, side='left')
+        return self.data.iloc[max(end - N, 0):end].reset_index(drop=True)
+
+    def get_bars_asof(self, timestamps, N=1, column='share_price', inclusive=False):
+        """ Get the last N values of a column as of each of many timestamps
+
+        All the timestamps are looked up with a single searchsorted over the
+        sorted timestamps of the data.
+
+        Parameters
+        ----------
+        timestamps: array-like
+            Query timestamps, in any order
+        N: int, optional
+            Number of bars in each window
+        column: str, optional
+            Column to get the values of. Defaults to share_price.
+        inclusive: bool, optional
+            If True, include the bar at the query timestamp. By default only
+            bars strictly before it are used, as in get_data_points.
+
+        Returns
+        -------
+        numpy.ndarray
+            Array of shape (len(timestamps), N), oldest value first. Windows with
+            fewer than N bars available are padded with NaN at the start.
 
-    def get_latest_bars(self, N):
-        return self.get_data_points(self.current_timestamp, N)
+        """
+        query = _to_nanoseconds(timestamps)
+        ends = np.searchsorted(self.timestamps_ns, query, side='right' if inclusive else 'left')
+        if N == 0:
+            return np.empty((len(query), 0))
+
+        padded = np.concatenate([np.full(N, np.nan), self._column_array(column)])
+
+        # Row j of the windows holds the N values before position j of the data
+        return sliding_window_view(padded, N)[ends]
+
+    def get_prices_asof(self, timestamps, column='share_price', inclusive=False):
+        """ Get the last value of a column as of each of many timestamps, NaN if none
+        """
+        return self.get_bars_asof(timestamps, 1, column, inclusive)[:, 0]
+
+    def get_latest_bars(self, N, timeframe=None):
+        """ Get the last N bars before the current timestamp
+
+        If a timeframe is given, get the last N bars of that timeframe instead,
+        the last of which is the bar in progress.
+        """
+        if timeframe is None:
+            return self.get_data_points(self.current_timestamp, N)
+        return self.add_timeframe(timeframe).latest(N)
+
+    def get_latest_prices(self):
+        """ Get the latest share price as an array, empty if there are no bars yet
+
+        The price is sliced from the share prices, without building the bars.
+        """
+        return self._column_array('share_price')[max(self.cursor - 1, 0):self.cursor]
+
+    def _column_array(self, column):
+        if column not in self._column_values:
+            self._column_values[column] = np.asarray(self.data[column], dtype=float)
+        return self._column_values[column]
 
     def update_bars(self):
         """ Generator to get the next bar value, and update the current timestamp
         """
-        next_step = next(self.data_generator)
-        next_bar = next_step[1]
-        if next_bar is None:
+        next_step = next(self.data_generator, None)
+        if next_step is None:
             return False
+        next_bar = next_step[1]
 
         self.current_timestamp = next_step[0]
+        self._advance_timeframes()
         self.events.put(MarketEvent(self.current_timestamp, next_bar, self))
 
+    def _advance_timeframes(self):
+        """ Add the bars that are now before the current timestamp to the derived timeframes
+        """
+        cursor = self.data.index.searchsorted(self.current_timestamp, side='left')
+        for resampler in self.timeframes.values():
+            self._feed_timeframe(resampler, cursor)
+        self.cursor = cursor
+
     def read_file(self, file_path):
         raise NotImplementedError("read_file must be implemented by inherited class")
 
@@ -85,13 +296,88 @@ class GoogleCSV(DailyHandler):
 
     def read_file(self, file_path):
         self.data = pd.read_csv(file_path)
-        self.data.index = self.data.Date.apply(lambda x: datetime.strptime(x, '%d-%b-%y'))
+        self.data.index = pd.to_datetime(self.data.Date, format='%d-%b-%y')
         self.data['share_price'] = self.data['Close']
 
         # Convert data to a datetime format
         self.data = self.data.sort_index(ascending=True)
 
 
+class PanelHandler(DataHandler):
+    """ Handler for a dates x symbols panel of share prices.
+
+    Each update releases one row of the panel for every symbol at once, so
+    cross-sectional strategies can work on the whole universe with array
+    operations rather than one handler per symbol.
+
+    """
+
+    def __init__(self, prices, dates, symbols, events):
+        self.prices = np.asarray(prices, dtype=float)
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.symbol = self.symbols
+        self.events = events
+
+        if self.prices.shape != (len(self.dates), len(self.symbols)):
+            raise ValueError("Prices of shape {} do not match {} dates and {} symbols"
+                             .format(self.prices.shape, len(self.dates), len(self.symbols)))
+
+        self.current_timestamp = self.dates[0]
+        # Number of rows before the current timestamp, and the next row to release
+        self.cursor = 0
+        self._next_row = 0
+        self._filled_prices = None
+        self._data_id = None
+
+    @classmethod
+    def from_file(cls, file_path, events, mmap=True):
+        """ Create a handler from a panel saved by panel_loader.save_panel
+        """
+        panel = read_panel(file_path, mmap=mmap)
+        return cls(panel.prices, panel.dates, panel.symbols, events)
+
+    @property
+    def data_id(self):
+        """ Hash identifying the dates, prices and symbols of the panel, computed once
+        """
+        if self._data_id is None:
+            self._data_id = fingerprint_panel(self.dates, self.prices, self.symbols)
+        return self._data_id
+
+    def get_latest_bars(self, N):
+        """ Get the last N rows of the panel before the current timestamp
+        """
+        return self.prices[max(self.cursor - N, 0):self.cursor]
+
+    def get_latest_prices(self):
+        """ Get the latest price of every symbol, empty if there are no bars yet
+        """
+        if self.cursor == 0:
+            return np.empty(0)
+        return self.prices[self.cursor - 1]
+
+    def get_latest_valid_prices(self):
+        """ Get the last valid price of every symbol, NaN for symbols without one yet
+        """
+        if self.cursor == 0:
+            return np.full(len(self.symbols), np.nan)
+        if self._filled_prices is None:
+            self._filled_prices = pd.DataFrame(self.prices).ffill().to_numpy()
+        return self._filled_prices[self.cursor - 1]
+
+    def update_bars(self):
+        """ Release the next row of the panel, and update the current timestamp
+        """
+        if self._next_row >= len(self.dates):
+            return False
+
+        self.cursor = self._next_row
+        self.current_timestamp = self.dates[self.cursor]
+        self._next_row += 1
+        self.events.put(MarketEvent(self.current_timestamp, self.prices[self.cursor], self))
+
+
 class QuandlReader(DailyHandler):
     """ Reader for Quadl data.
 
@@ -107,17 +393,6 @@ class QuandlReader(DailyHandler):
         self.data = quandl.get(symbol)
         self.data['share_price'] = self.data['Price']
         self.symbol = symbol
-
-        self.events = events
         self.lookback = lookback
 
-        if max_timestamp is not None:
-            self.data = self.data[self.data.index <= max_timestamp]
-
-        if current_timestamp is None:
-            self.current_timestamp = self.data.index[0]
-        else:
-            self.current_timestamp = current_timestamp
-
-        # This is the point to iterate through the data
-        self.data_generator = self.data.iterrows()
+        self.start(events, max_timestamp, current_timestamp)
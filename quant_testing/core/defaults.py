@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def ib_comission(quantity):
     """
     Calculates the fees of trading based on an Interactive
@@ -14,3 +17,13 @@ def ib_comission(quantity):
     else:  # Greater than 500
         full_cost = max(1.3, 0.008 * quantity)
     return full_cost
+
+
+def ib_basket_comission(quantities):
+    """
+    Vectorised version of ib_comission, for the trades of a whole basket of
+    instruments at once. Instruments that are not traded have no cost.
+    """
+    quantities = np.abs(np.asarray(quantities, dtype=float))
+    rate = np.where(quantities <= 500, 0.013, 0.008)
+    return np.where(quantities > 0, np.maximum(1.3, rate * quantities), 0.0)
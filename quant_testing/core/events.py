@@ -2,6 +2,7 @@
 class ExecutionType:
     buy = 1
     sell = 2
+    rebalance = 3
 
 
 class Event:
@@ -47,6 +48,25 @@ class SignalEvent(Event):
         self.signal_type = signal_type
 
 
+class TargetWeightEvent(SignalEvent):
+    """
+    Handles the event of a cross-sectional Strategy sending target
+    portfolio weights for a whole universe of symbols at once.
+    """
+
+    def __init__(self, symbols, datetime, weights):
+        """
+        Initialises the TargetWeightEvent.
+
+        Parameters:
+        symbols - The ticker symbols of the universe, in panel order.
+        datetime - The timestamp at which the weights were generated.
+        weights - Array of target weights, one per symbol.
+        """
+        super().__init__(symbols, datetime, ExecutionType.rebalance)
+        self.weights = weights
+
+
 class OrderEvent(Event):
     """
     Handles the event of sending an Order to an execution system.
@@ -1,4 +1,5 @@
 from abc import ABCMeta, abstractmethod
+import numpy as np
 from quant_testing.core.events import FillEvent
 
 
@@ -29,8 +30,7 @@ class NaiveSimulationExecutor(Executor):
         order_event.print_order
 
         # Get the latest price
-        lastest_bars = self.tick_data.get_latest_bars(1)
-        price = lastest_bars['share_price'].iloc[0]
+        price = self.tick_data.get_latest_prices()[0]
 
         # Get the transaction_costs
         num_shares = order_event.quantity
@@ -40,3 +40,22 @@ class NaiveSimulationExecutor(Executor):
         fill = FillEvent(None, None, None, num_shares,
                          order_event.direction, price, commission=commission)
         self.events.put(fill)
+
+
+class NaivePanelExecutor(Executor):
+
+    def __init__(self, portfolio, events, tick_data):
+
+        self.portfolio = portfolio
+        self.events = events
+        self.tick_data = tick_data
+
+    def fill_order(self, order_event):
+        """Fill a basket order at the latest prices of the panel, in one step
+        """
+        prices = self.tick_data.get_latest_bars(1)[-1]
+        commission = float(np.sum(self.portfolio.commission(order_event.quantity)))
+
+        fill = FillEvent(None, order_event.symbol, None, order_event.quantity,
+                         order_event.direction, prices, commission=commission)
+        self.events.put(fill)
@@ -0,0 +1,189 @@
+""" Indicators shared between all the strategies running on a datahandler.
+
+Strategies declare the indicators they need, and the IndicatorRegistry of the
+datahandler computes each distinct indicator (same type, input and window)
+once, vectorised over the whole history. Indicators may depend on other
+indicators, which are registered and computed first.
+
+The computed series are shared between the registries of every handler on
+the same data, identified by the data_id of the handler, so simulations of
+many strategy variants on one dataset compute each indicator only once.
+
+The value of an indicator at bar i only uses the bars before it, as with
+DataHandler.get_latest_bars.
+"""
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Number of datasets whose computed series are kept for other handlers
+MAX_SHARED_DATASETS = 16
+
+# Computed series of the most recently used datasets, keyed on their data id
+_shared_series = OrderedDict()
+
+
+def _series_store(data_id):
+    """ Get the dict of computed series of a dataset, shared by all of its handlers
+    """
+    if data_id is None:
+        return {}
+    if data_id in _shared_series:
+        _shared_series.move_to_end(data_id)
+    else:
+        _shared_series[data_id] = {}
+        while len(_shared_series) > MAX_SHARED_DATASETS:
+            _shared_series.popitem(last=False)
+    return _shared_series[data_id]
+
+
+def rolling(values, window, min_periods, func):
+    """ Apply func over the (up to) window values before each position
+
+    Parameters
+    ----------
+    values: numpy.ndarray
+        Values to roll over
+    window: int
+        Maximum number of values before each position
+    min_periods: int
+        Minimum number of values needed, otherwise the result is NaN
+    func: callable
+        Reduction such as np.mean, called with an axis keyword
+
+    Returns
+    -------
+    numpy.ndarray
+        Result at every position of values
+
+    """
+    result = np.full(len(values), np.nan)
+    for end in range(max(min_periods, 1), min(window, len(values))):
+        result[end] = func(values[:end])
+    if len(values) > window:
+        result[window:] = func(sliding_window_view(values[:-1], window), axis=1)
+    return result
+
+
+class Indicator:
+    """ Base class of an indicator of one column of the data
+
+    Two indicators with the same key are the same indicator, and are only
+    computed once by a registry.
+    """
+
+    def __init__(self, window, column='share_price', min_periods=None):
+        self.window = window
+        self.column = column
+        self.min_periods = window if min_periods is None else min_periods
+
+    @property
+    def key(self):
+        return (type(self).__name__, self.column, self.window, self.min_periods)
+
+    def dependencies(self):
+        return []
+
+    def compute(self, values, inputs):
+        """ Compute the indicator at every bar
+
+        Parameters
+        ----------
+        values: numpy.ndarray
+            Values of the input column
+        inputs: list
+            Computed series of each of the dependencies
+
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return "{}{}".format(type(self).__name__, self.key[1:])
+
+
+class SMA(Indicator):
+    """ Simple moving average """
+
+    def compute(self, values, inputs):
+        return rolling(values, self.window, self.min_periods, np.mean)
+
+
+class STD(Indicator):
+    """ Moving (population) standard deviation """
+
+    def compute(self, values, inputs):
+        return rolling(values, self.window, self.min_periods, np.std)
+
+
+class ZScore(Indicator):
+    """ Number of moving standard deviations the last value is from the moving average
+    """
+
+    def dependencies(self):
+        return [SMA(self.window, self.column, self.min_periods),
+                STD(self.window, self.column, self.min_periods)]
+
+    def compute(self, values, inputs):
+        mean, std = inputs
+        last_value = np.concatenate([[np.nan], values[:-1]])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (last_value - mean) / std
+
+
+class IndicatorRegistry:
+    """ Registry of the indicators of a datahandler.
+
+    Parameters
+    ----------
+    datahandler: DailyHandler
+        Handler whose data the indicators are computed on. Its cursor gives
+        the number of bars before the current timestamp, and its data_id the
+        dataset whose computed series are shared.
+
+    """
+
+    def __init__(self, datahandler):
+        self.datahandler = datahandler
+        self.indicators = {}
+        self._store = None
+
+    @property
+    def _series(self):
+        if self._store is None:
+            self._store = _series_store(getattr(self.datahandler, 'data_id', None))
+        return self._store
+
+    def __len__(self):
+        return len(self.indicators)
+
+    def __contains__(self, indicator):
+        return indicator.key in self.indicators
+
+    def register(self, indicator):
+        """ Register an indicator and its dependencies, returning the shared instance
+        """
+        if indicator.key not in self.indicators:
+            for dependency in indicator.dependencies():
+                self.register(dependency)
+            self.indicators[indicator.key] = indicator
+        return self.indicators[indicator.key]
+
+    def series(self, indicator):
+        """ Values of the indicator at every bar of the data, computed on first use
+        """
+        indicator = self.register(indicator)
+        if indicator.key not in self._series:
+            inputs = [self.series(dependency) for dependency in indicator.dependencies()]
+            values = np.asarray(self.datahandler.data[indicator.column], dtype=float)
+            self._series[indicator.key] = indicator.compute(values, inputs)
+        return self._series[indicator.key]
+
+    def value(self, indicator):
+        """ Value of the indicator at the current timestamp of the datahandler
+        """
+        series = self.series(indicator)
+        cursor = self.datahandler.cursor
+        if cursor >= len(series):
+            return np.nan
+        return series[cursor]
@@ -0,0 +1,189 @@
+""" Binary journal of the events processed by a Simulator, and its replay.
+
+Every event is written as one fixed width record, so a journal can be read
+back as a memory mapped numpy structured array. Replaying a journal feeds the
+recorded signals straight into a new portfolio and executor, skipping the
+data handling and strategy work of the original run.
+"""
+import numpy as np
+import pandas as pd
+
+from .datahandler import DataHandler
+from .events import MarketEvent, SignalEvent, OrderEvent, FillEvent
+
+JOURNAL_DTYPE = np.dtype([('kind', 'u1'),
+                          ('direction', 'i1'),
+                          ('timestamp', 'i8'),
+                          ('quantity', 'f8'),
+                          ('price', 'f8'),
+                          ('commission', 'f8')])
+
+MARKET = 1
+SIGNAL = 2
+ORDER = 3
+FILL = 4
+
+NO_TIMESTAMP = np.iinfo('int64').min
+
+
+def _to_nanoseconds(timestamp):
+    if timestamp is None:
+        return NO_TIMESTAMP
+    return pd.Timestamp(timestamp).value
+
+
+def _share_price(last_tick):
+    try:
+        return float(last_tick['share_price'])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return np.nan
+
+
+NAN = float('nan')
+
+
+def read_journal(file_path):
+    """ Memory map a journal as a structured array with JOURNAL_DTYPE
+    """
+    return np.memmap(file_path, dtype=JOURNAL_DTYPE, mode='r')
+
+
+class EventJournal:
+    """ Writer of the events of a simulation to a binary journal.
+
+    Every record is stamped with the timestamp of the bar being processed.
+    Market records hold the share price of the new bar, signals their type,
+    and orders and fills their quantity and direction, price and commission.
+    Only single share simulations can be journalled, as basket orders do not
+    fit a fixed width record.
+
+    Parameters
+    ----------
+    file_path: str
+        Path of the journal. Any existing file is overwritten.
+    buffer_size: int, optional
+        Number of records kept in memory between writes to disk
+
+    """
+
+    def __init__(self, file_path, buffer_size=4096):
+        self.file_path = file_path
+        self._file = open(file_path, 'wb')
+        self._buffer = np.zeros(buffer_size, dtype=JOURNAL_DTYPE)
+        self._buffered = 0
+        self.count = 0
+
+        # Every event of a bar is stamped with the same timestamp, converted once
+        self._timestamp = None
+        self._timestamp_ns = NO_TIMESTAMP
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, event, timestamp):
+        """ Add an event to the journal
+
+        Parameters
+        ----------
+        event: Event
+            Event processed by the simulation
+        timestamp: pd.Timestamp
+            Current timestamp of the datahandler when the event is processed
+
+        """
+        if isinstance(event, (OrderEvent, FillEvent)) and np.ndim(event.quantity):
+            raise ValueError("Can not journal the basket quantity of {}, only single share "
+                             "simulations can be journalled".format(event))
+
+        if timestamp is not self._timestamp:
+            self._timestamp = timestamp
+            self._timestamp_ns = _to_nanoseconds(timestamp)
+
+        # The record is assigned as a whole, in the field order of JOURNAL_DTYPE
+        if isinstance(event, MarketEvent):
+            record = (MARKET, 0, self._timestamp_ns, NAN, _share_price(event.last_tick), NAN)
+        elif isinstance(event, SignalEvent):
+            record = (SIGNAL, event.signal_type, self._timestamp_ns, NAN, NAN, NAN)
+        elif isinstance(event, OrderEvent):
+            record = (ORDER, event.direction, self._timestamp_ns, event.quantity, NAN, NAN)
+        elif isinstance(event, FillEvent):
+            record = (FILL, event.direction, self._timestamp_ns, event.quantity,
+                      event.price, event.commission)
+        else:
+            raise ValueError("Can not journal event {}".format(event))
+
+        self._buffer[self._buffered] = record
+        self._buffered += 1
+        self.count += 1
+        if self._buffered == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer[:self._buffered].tobytes())
+        self._file.flush()
+        self._buffered = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class JournalReplayHandler(DataHandler):
+    """ Datahandler replaying the signals of a journal.
+
+    Each update moves to the next recorded bar and puts the signals that were
+    generated on it straight onto the events queue. The share prices of the
+    recorded bars are served to the portfolio and executor by get_latest_prices,
+    as slices of the recorded prices, so a Simulator run with this handler and
+    no strategy replays the original run with a new portfolio or executor.
+
+    The journal must have been recorded from the start of the data.
+    """
+
+    def __init__(self, file_path, events, symbol=None):
+        self.events = events
+        self.symbol = symbol
+
+        records = np.asarray(read_journal(file_path))
+        market = records['kind'] == MARKET
+        market_positions = np.flatnonzero(market)
+
+        self.timestamps = pd.DatetimeIndex(records['timestamp'][market])
+        self.prices = records['price'][market]
+
+        # The signals recorded after each bar, and before the next
+        signal_positions = np.flatnonzero(records['kind'] == SIGNAL)
+        bar_of_signal = np.searchsorted(market_positions, signal_positions, side='right') - 1
+        self.signals = [[] for _ in range(len(market_positions))]
+        for bar, position in zip(bar_of_signal, signal_positions):
+            self.signals[bar].append(records[position])
+
+        self.current_timestamp = self.timestamps[0] if len(self.timestamps) else None
+        self.cursor = 0
+        self._next_bar = 0
+
+    def get_latest_bars(self, N):
+        return pd.DataFrame({'share_price': self.prices[max(self.cursor - N, 0):self.cursor]})
+
+    def get_latest_prices(self):
+        return self.prices[max(self.cursor - 1, 0):self.cursor]
+
+    def update_bars(self):
+        if self._next_bar >= len(self.timestamps):
+            return False
+
+        self.cursor = self._next_bar
+        self.current_timestamp = self.timestamps[self.cursor]
+        self._next_bar += 1
+
+        for record in self.signals[self.cursor]:
+            timestamp = record['timestamp']
+            if timestamp == NO_TIMESTAMP:
+                timestamp = None
+            else:
+                timestamp = pd.Timestamp(timestamp)
+            self.events.put(SignalEvent(self.symbol, timestamp, int(record['direction'])))
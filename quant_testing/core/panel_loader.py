@@ -0,0 +1,171 @@
+""" Bulk loading of many symbol files into one aligned price panel.
+
+Files are read in parallel, aligned on the union of their dates and returned
+as a single contiguous (dates x symbols) array. Panels can be saved to a
+single binary file, which is memory mapped when it is read back.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import glob
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+Panel = namedtuple('Panel', ['dates', 'symbols', 'prices', 'missing'])
+
+PANEL_MAGIC = b'QTPANEL1'
+ALIGNMENT = 64
+
+
+def read_google_csv(file_path):
+    """ Read the dates and closing prices of a google finance csv file
+
+    Returns
+    -------
+    tuple
+        (dates, prices), as int64 nanosecond timestamps and floats, sorted by date
+
+    """
+    data = pd.read_csv(file_path, usecols=['Date', 'Close'])
+    dates = pd.to_datetime(data['Date'], format='%d-%b-%y').values.astype('datetime64[ns]')
+    order = np.argsort(dates, kind='stable')
+    return dates.view('int64')[order], data['Close'].values.astype(float)[order]
+
+
+def forward_fill(prices):
+    """ Forward fill the missing values of each column of prices, in place
+    """
+    valid = ~np.isnan(prices)
+    rows = np.where(valid, np.arange(len(prices))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    prices[:] = np.take_along_axis(prices, rows, axis=0)
+    return prices
+
+
+def load_panel(files, reader=read_google_csv, fill='ffill', max_workers=None,
+               use_processes=False, save_path=None):
+    """ Load many symbol files into one panel aligned on the union of their dates
+
+    Parameters
+    ----------
+    files: str or list
+        Directory of csv files, or a list of file paths
+    reader: callable, optional
+        Function of a file path returning (int64 dates, prices). Defaults to
+        read_google_csv. Must be picklable if use_processes is True.
+    fill: str, optional
+        'ffill' to forward fill missing prices, or 'mask' to leave them as NaN.
+        In both cases the missing entries are recorded in Panel.missing.
+    max_workers: int, optional
+        Number of workers in the pool
+    use_processes: bool, optional
+        If True, read the files on a process pool rather than a thread pool
+    save_path: str, optional
+        If given, save the panel to this file with save_panel
+
+    Returns
+    -------
+    Panel
+        Named tuple of dates, symbols, prices and the missing value mask
+
+    """
+    if fill not in ('ffill', 'mask'):
+        raise ValueError("Unknown fill method {}".format(fill))
+
+    if isinstance(files, str):
+        files = sorted(glob.glob(os.path.join(files, '*.csv')))
+    symbols = [os.path.splitext(os.path.basename(file_path))[0] for file_path in files]
+
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_class(max_workers=max_workers) as pool:
+        series = list(pool.map(reader, files))
+
+    calendar = np.unique(np.concatenate([dates for dates, _ in series]))
+    prices = np.full((len(calendar), len(series)), np.nan)
+    for column, (dates, values) in enumerate(series):
+        prices[np.searchsorted(calendar, dates), column] = values
+
+    missing = np.isnan(prices)
+    if fill == 'ffill':
+        forward_fill(prices)
+
+    panel = Panel(pd.DatetimeIndex(calendar.astype('datetime64[ns]')), symbols, prices, missing)
+    if save_path is not None:
+        save_panel(save_path, panel)
+    return panel
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_panel(file_path, panel):
+    """ Save a panel to a single binary file
+
+    The file is a json header followed by the dates, prices and missing mask
+    as raw arrays, each aligned so that they can be memory mapped.
+    """
+    n_dates, n_symbols = panel.prices.shape
+    header = {'symbols': list(panel.symbols), 'shape': [n_dates, n_symbols]}
+
+    # The header size depends on the offsets, so find the offsets with a placeholder
+    header_bytes = json.dumps(dict(header, offsets=[0, 0, 0])).encode()
+    while True:
+        dates_offset = _aligned(len(PANEL_MAGIC) + 8 + len(header_bytes))
+        prices_offset = _aligned(dates_offset + 8 * n_dates)
+        missing_offset = _aligned(prices_offset + 8 * n_dates * n_symbols)
+        offsets = [dates_offset, prices_offset, missing_offset]
+        new_header_bytes = json.dumps(dict(header, offsets=offsets)).encode()
+        if len(new_header_bytes) <= len(header_bytes):
+            header_bytes = new_header_bytes.ljust(len(header_bytes))
+            break
+        header_bytes = new_header_bytes
+
+    dates = np.asarray(panel.dates.values.astype('datetime64[ns]').view('int64'))
+    with open(file_path, 'wb') as panel_file:
+        panel_file.write(PANEL_MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes)
+        for offset, array in zip(offsets, (dates, panel.prices, panel.missing)):
+            panel_file.seek(offset)
+            panel_file.write(np.ascontiguousarray(array).tobytes())
+
+
+def read_panel(file_path, mmap=True):
+    """ Read a panel saved with save_panel
+
+    Parameters
+    ----------
+    file_path: str
+        Path of the panel file
+    mmap: bool, optional
+        If True (default) the prices and mask are memory mapped, read only
+
+    Returns
+    -------
+    Panel
+
+    """
+    with open(file_path, 'rb') as panel_file:
+        if panel_file.read(len(PANEL_MAGIC)) != PANEL_MAGIC:
+            raise ValueError("{} is not a panel file".format(file_path))
+        header_length, = struct.unpack('<Q', panel_file.read(8))
+        header = json.loads(panel_file.read(header_length))
+
+    n_dates, n_symbols = header['shape']
+    dates_offset, prices_offset, missing_offset = header['offsets']
+    layout = [('int64', (n_dates,), dates_offset),
+              ('float64', (n_dates, n_symbols), prices_offset),
+              ('bool', (n_dates, n_symbols), missing_offset)]
+
+    arrays = []
+    for dtype, shape, offset in layout:
+        if mmap and np.prod(shape):
+            arrays.append(np.memmap(file_path, dtype=dtype, mode='r', offset=offset, shape=shape))
+        else:
+            arrays.append(np.fromfile(file_path, dtype=dtype, count=int(np.prod(shape)),
+                                      offset=offset).reshape(shape))
+    dates, prices, missing = arrays
+    return Panel(pd.DatetimeIndex(np.asarray(dates).astype('datetime64[ns]')),
+                 header['symbols'], prices, missing)
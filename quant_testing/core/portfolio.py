@@ -1,6 +1,8 @@
 # ###########################################################################
 # Portfolio classes
-from .defaults import ib_comission
+import numpy as np
+
+from .defaults import ib_comission, ib_basket_comission
 from quant_testing.core.events import ExecutionType, OrderEvent
 
 import logging
@@ -26,15 +28,27 @@ class SingleSharePortfolio(Portfolio):
     @property
     def value(self):
         # First we need the current share price
-        current_data = self.tick_data.get_latest_bars(1)
-        share_price = current_data['share_price'].iloc[0] if not current_data.empty else 0
+        prices = self.tick_data.get_latest_prices()
+        share_price = prices[0] if len(prices) else 0
 
         return self.cash + self.shares*share_price
 
+    @property
+    def position(self):
+        """ Size of the position, as recorded in the shares column of the equity curve
+        """
+        return self.shares
+
+    @property
+    def weights(self):
+        prices = self.tick_data.get_latest_prices()
+        if not len(prices) or not self.value:
+            return np.zeros(1)
+        return np.array([self.shares * prices[0] / self.value])
+
     def determine_move(self, signal_event):
         # First we need the current share price
-        current_data = self.tick_data.get_latest_bars(1)
-        share_price = current_data['share_price'].iloc[0]
+        share_price = self.tick_data.get_latest_prices()[0]
 
         # Get approximate transaction_costs - always buy roughly half the portfolio
         approx_shares = int(0.5*(self.cash // share_price))
@@ -89,3 +103,83 @@ class SingleSharePortfolio(Portfolio):
             self.sell_instrument(qnty, price, costs)
         else:
             raise ValueError("Unknown direction {}".format(fill_order.direction))
+
+
+class PanelPortfolio(Portfolio):
+    """Portfolio of cash and shares in every symbol of a PanelHandler
+
+    Orders are generated from TargetWeightEvents, rebalancing the whole universe
+    with a single basket order.
+
+    """
+
+    def __init__(self, events, cash, tick_data, commission_calc=ib_basket_comission,
+                 cash_buffer=0.01):
+        self.events = events
+        self.cash = cash
+        self.tick_data = tick_data
+        self.commission = commission_calc
+        self.cash_buffer = cash_buffer
+        self.shares = np.zeros(len(tick_data.symbols))
+
+    def _latest_prices(self):
+        current_data = self.tick_data.get_latest_bars(1)
+        if len(current_data) == 0:
+            return np.full(len(self.shares), np.nan)
+        return current_data[-1]
+
+    @property
+    def value(self):
+        # Holdings are valued at the last valid price of their symbol
+        prices = self.tick_data.get_latest_valid_prices()
+        return self.cash + np.nansum(self.shares * prices)
+
+    @property
+    def position(self):
+        """ Number of symbols held, as recorded in the shares column of the equity curve
+        """
+        return int(np.count_nonzero(self.shares))
+
+    @property
+    def weights(self):
+        prices = self.tick_data.get_latest_valid_prices()
+        value = self.cash + np.nansum(self.shares * prices)
+        if not value:
+            return np.zeros(len(self.shares))
+        return np.nan_to_num(self.shares * prices) / value
+
+    def determine_move(self, signal_event):
+        prices = self._latest_prices()
+        weights = np.nan_to_num(np.asarray(signal_event.weights, dtype=float))
+        investable = (1 - self.cash_buffer) * self.value
+
+        # Symbols without a price can not be traded, so keep their current holding
+        tradeable = np.isfinite(prices) & (prices > 0)
+        target = self.shares.copy()
+        target[tradeable] = np.floor(weights[tradeable] * investable / prices[tradeable])
+
+        quantity = target - self.shares
+        if np.any(quantity):
+            return OrderEvent(signal_event.symbol, 'MKT_ORDER', quantity, ExecutionType.rebalance)
+
+    def generate_order(self, signal_event):
+        order_event = self.determine_move(signal_event)
+        if order_event is not None:
+            self.events.put(order_event)
+
+    def update_portfolio(self, fill_order):
+        """Update the portfolio
+        """
+        if fill_order.direction != ExecutionType.rebalance:
+            raise ValueError("Unknown direction {}".format(fill_order.direction))
+
+        traded = fill_order.quantity != 0
+        total_cost = (np.sum(fill_order.quantity[traded] * fill_order.price[traded])
+                      + fill_order.commission)
+        if total_cost > self.cash:
+            logger.warning("Not possible to execute strategy"
+                           " - insufficient funds!")
+            return
+
+        self.cash -= total_cost
+        self.shares = self.shares + fill_order.quantity
@@ -0,0 +1,130 @@
+""" Rolling risk measures of a multi-asset portfolio, updated bar by bar.
+
+The covariance of the asset returns is an exponentially weighted moving
+average, updated in place with a rank-one update for every new bar rather
+than recomputed from the history.
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+
+class RiskEngine:
+    """ Incremental risk engine for a fixed universe of assets.
+
+    Parameters
+    ----------
+    n_assets: int
+        Number of assets in the universe
+    decay: float, optional
+        Decay factor of the exponentially weighted covariance. Defaults to 0.94,
+        as in RiskMetrics.
+    window: int, optional
+        Number of bars of returns kept for the historical VaR and CVaR.
+    min_periods: int, optional
+        Number of returns needed before any risk measure is reported.
+
+    """
+
+    def __init__(self, n_assets, decay=0.94, window=250, min_periods=2):
+        self.n_assets = n_assets
+        self.decay = decay
+        self.window = window
+        self.min_periods = min_periods
+
+        self.covariance = np.zeros((n_assets, n_assets))
+        self.count = 0
+        self.latest = None
+
+        self._last_prices = None
+        self._returns = np.zeros((window, n_assets))
+
+    @property
+    def ready(self):
+        return self.count >= self.min_periods
+
+    @property
+    def returns(self):
+        """ Asset returns kept for the historical measures, oldest first
+        """
+        if self.count < self.window:
+            return self._returns[:self.count]
+        return np.roll(self._returns, -(self.count % self.window), axis=0)
+
+    def update(self, prices, weights=None):
+        """ Update the risk measures with the latest prices of every asset
+
+        Parameters
+        ----------
+        prices: array
+            Latest price of each asset. Missing prices count as no return.
+        weights: array, optional
+            Current portfolio weights. If given, latest is set to the snapshot
+            of the risk measures for these weights.
+
+        """
+        prices = np.asarray(prices, dtype=float)
+        if self._last_prices is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                asset_returns = prices / self._last_prices - 1
+            asset_returns[~np.isfinite(asset_returns)] = 0
+
+            # Exponentially weighted covariance, assuming zero mean returns
+            self.covariance *= self.decay
+            self.covariance += np.outer((1 - self.decay) * asset_returns, asset_returns)
+            if self.count == 0:
+                self.covariance /= (1 - self.decay)
+
+            self._returns[self.count % self.window] = asset_returns
+            self.count += 1
+
+        if self._last_prices is None:
+            self._last_prices = prices
+        else:
+            self._last_prices = np.where(np.isfinite(prices), prices, self._last_prices)
+
+        if weights is not None and self.ready:
+            self.latest = self.snapshot(weights)
+
+    def portfolio_volatility(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        return float(np.sqrt(max(weights @ self.covariance @ weights, 0)))
+
+    def parametric_var(self, weights, alpha=0.05):
+        """ Value at risk over one bar, as a positive fraction of the portfolio value
+        """
+        return -NormalDist().inv_cdf(alpha) * self.portfolio_volatility(weights)
+
+    def parametric_cvar(self, weights, alpha=0.05):
+        """ Expected shortfall over one bar, as a positive fraction of the portfolio value
+        """
+        z = NormalDist().inv_cdf(alpha)
+        return NormalDist().pdf(z) / alpha * self.portfolio_volatility(weights)
+
+    def historical_var(self, weights, alpha=0.05):
+        portfolio_returns = self.returns @ np.asarray(weights, dtype=float)
+        return float(-np.quantile(portfolio_returns, alpha))
+
+    def historical_cvar(self, weights, alpha=0.05):
+        portfolio_returns = self.returns @ np.asarray(weights, dtype=float)
+        tail = portfolio_returns[portfolio_returns <= np.quantile(portfolio_returns, alpha)]
+        return float(-tail.mean())
+
+    def risk_contributions(self, weights):
+        """ Contribution of each asset to the portfolio volatility, summing to it
+        """
+        weights = np.asarray(weights, dtype=float)
+        volatility = self.portfolio_volatility(weights)
+        if volatility == 0:
+            return np.zeros(self.n_assets)
+        return weights * (self.covariance @ weights) / volatility
+
+    def snapshot(self, weights, alpha=0.05):
+        """ All the risk measures for the given weights
+        """
+        return {'volatility': self.portfolio_volatility(weights),
+                'parametric_var': self.parametric_var(weights, alpha),
+                'parametric_cvar': self.parametric_cvar(weights, alpha),
+                'historical_var': self.historical_var(weights, alpha),
+                'historical_cvar': self.historical_cvar(weights, alpha),
+                'risk_contributions': self.risk_contributions(weights)}
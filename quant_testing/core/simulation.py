@@ -2,43 +2,103 @@ from . import events
 import queue
 import pandas as pd
 
+from quant_testing.analytics.streaming_metrics import StreamingMetrics
+
 
 class Simulator:
 
-    def __init__(self, portfolio, strategy, datahandler, execution_handler):
+    def __init__(self, portfolio, strategy, datahandler, execution_handler, cache=None,
+                 risk_engine=None, keep_history=True, journal=None):
+        if cache is not None and journal is not None:
+            raise ValueError("Can not journal a simulator with a cache, a cached equity "
+                             "curve is returned without running, and so journalling, "
+                             "the simulation")
 
         self.portfolio = portfolio
         self.strategy = strategy
         self.datahandler = datahandler
         self.execution_handler = execution_handler
+        self.cache = cache
+        self.risk_engine = risk_engine
+        self.journal = journal
 
+        # Every bar is kept in returns if keep_history, otherwise only the last
+        self.keep_history = keep_history
         self.returns = []
+        self.last_record = None
+        self.metrics = StreamingMetrics()
         self.events = self.datahandler.events
 
         self.signal_count = 0
         self.order_count = 0
         self.fill_count = 0
         self.cumulative_comission = 0
+        self.stopped_early = False
+
+        self._register_indicators()
+
+    def _register_indicators(self):
+        """ Register the indicators the strategy needs with the datahandler registry
+
+        Strategies on the same datahandler then share any indicator they have in common.
+        """
+        registry = getattr(self.datahandler, 'indicators', None)
+        if registry is None or self.strategy is None:
+            return
+        for indicator in self.strategy.required_indicators:
+            registry.register(indicator)
 
     def backtest(self, finish):
+        """ Run the simulation up to finish and return the equity curve
+
+        If the simulator has a cache, a previously stored equity curve for the
+        same data, strategy, portfolio and commission is returned instead of
+        re-running the simulation.
+        """
+        if not self.keep_history:
+            raise ValueError("The equity curve is not kept with keep_history=False, "
+                             "use run_metrics instead of backtest")
+
+        if self.cache is not None:
+            key = self.cache.make_key(self, finish)
+            eq_curve = self.cache.get(key)
+            if eq_curve is not None:
+                return eq_curve
+
         self._run_simulation(finish)
         eq_curve = self._generate_summary_stats()
+        if self.journal is not None:
+            self.journal.flush()
+
+        if self.cache is not None:
+            self.cache.put(key, eq_curve)
         return eq_curve
 
-    def _run_simulation(self, finish, output=False):
+    def run_metrics(self, finish):
+        """ Run the simulation up to finish and return only the final metrics
+
+        Use with keep_history=False to run without keeping the equity curve.
+        """
+        self._run_simulation(finish)
+        return self.metrics.summary()
+
+    def _run_simulation(self, finish, output=False, max_drawdown=None):
         """ Run a share simulation from start to finish
 
+        The simulation can be continued by calling this again with a later
+        finish, picking up from the last bar that was processed.
+
         start_time: pd.Timestamp
             Timestamp to start the simulation
         end_time: pd.Timestamp
             timestamp to end the simulation
         output: bool, optional
             If True, print the portfolio after every event
+        max_drawdown: float, optional
+            If given, stop the simulation early once the drawdown exceeds it,
+            and set stopped_early
 
         """
-        high_water_mark = 0
-        drawdown = 0
-
         while True:
 
             while True:
@@ -49,6 +109,9 @@ class Simulator:
                     break
                 else:
                     if event is not None:
+                        if self.journal is not None:
+                            self.journal.record(event, self.datahandler.current_timestamp)
+
                         if isinstance(event, events.MarketEvent):
                             self.strategy.generate_strategy(event)
 
@@ -64,45 +127,47 @@ class Simulator:
                             self.fill_count += 1
                             self.cumulative_comission += event.commission
                             self.portfolio.update_portfolio(event)
+                            self.metrics.update_fill(event)
 
-            if not self.returns or self.datahandler.current_timestamp != self.returns[-1][0]:
-                high_water_mark, drawdown = self._calculate_drawdown(high_water_mark, drawdown)
-                if not self.returns:
+            if (self.last_record is None
+                    or self.datahandler.current_timestamp != self.last_record[0]):
+                value = self.portfolio.value
+                if self.last_record is None:
                     daily_return = 0
                 else:
-                    daily_return = ((self.portfolio.value - self.returns[-1][3])
-                                    / self.returns[-1][3])
-
-                self.returns.append((self.datahandler.current_timestamp,
-                                     self.portfolio.cash,
-                                     self.portfolio.shares,
-                                     self.portfolio.value,
-                                     daily_return,
-                                     self.cumulative_comission,
-                                     drawdown))
+                    daily_return = (value - self.last_record[3]) / self.last_record[3]
+                self.metrics.update(value, daily_return)
+
+                self.last_record = (self.datahandler.current_timestamp,
+                                    self.portfolio.cash,
+                                    self.portfolio.position,
+                                    value,
+                                    daily_return,
+                                    self.cumulative_comission,
+                                    self.metrics.drawdown.drawdown)
+                if self.keep_history:
+                    self.returns.append(self.last_record)
+
+                if self.risk_engine is not None:
+                    self._update_risk()
             if output:
                 print("cash: {}, shares: {}".format(self.portfolio.cash,
                                                     self.portfolio.shares))
 
+            if max_drawdown is not None and self.metrics.drawdown.drawdown > max_drawdown:
+                self.stopped_early = True
+                break
+
             update_result = self.datahandler.update_bars()
             if update_result is False or self.datahandler.current_timestamp >= finish:
                 break
 
-    def _calculate_drawdown(self, high_water_mark, drawdown):
-        """ Calculate the drawdown
-
+    def _update_risk(self):
+        """ Update the risk engine with the latest prices and portfolio weights
         """
-        if not self.returns:
-            drawdown = 0
-            high_water_mark = self.portfolio.value
-
-        if self.portfolio.value >= high_water_mark:
-            high_water_mark = self.portfolio.value
-            drawdown = 0
-        else:
-            drawdown = (high_water_mark - self.portfolio.value) / high_water_mark
-
-        return high_water_mark, drawdown
+        prices = self.datahandler.get_latest_prices()
+        if len(prices):
+            self.risk_engine.update(prices, self.portfolio.weights)
 
     def _generate_summary_stats(self):
         """Generate a pandas dataframe of the results
@@ -0,0 +1,257 @@
+""" Helpers for storing pandas dataframes as a directory of numpy columns.
+
+Each column is written to its own .npy file, so a reader can load only the
+columns it needs, and can memory map them rather than reading them into memory.
+ColumnSegments packs many dataframes into the same column files instead,
+each dataframe being a segment of rows.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+INDEX_FILE = '__index__.npy'
+LAYOUT_FILE = 'columns.json'
+INDEX_KEY = '__index__'
+
+
+def _check_columns(df):
+    object_columns = [str(col) for col in df.columns if df[col].dtype == object]
+    if object_columns:
+        raise ValueError("Can not write object columns {}, they can not be read back "
+                         "without pickle or memory mapped".format(object_columns))
+
+
+def write_frame(path, df):
+    """ Write a dataframe to path as one .npy file per column
+
+    Parameters
+    ----------
+    path: str
+        Directory to write the columns to. Created if it does not exist.
+    df: pandas.DataFrame
+        Dataframe to write. Columns must have a numeric or datetime dtype.
+
+    Returns
+    -------
+    int
+        Number of bytes written
+
+    """
+    _check_columns(df)
+
+    os.makedirs(path, exist_ok=True)
+    columns = [str(col) for col in df.columns]
+    layout = {'index_name': df.index.name, 'columns': columns}
+
+    size = 0
+    np.save(os.path.join(path, INDEX_FILE), np.asarray(df.index.values))
+    size += os.path.getsize(os.path.join(path, INDEX_FILE))
+    for number, col in enumerate(df.columns):
+        file_name = os.path.join(path, '{}.npy'.format(number))
+        np.save(file_name, np.asarray(df[col].values))
+        size += os.path.getsize(file_name)
+
+    with open(os.path.join(path, LAYOUT_FILE), 'w') as layout_file:
+        json.dump(layout, layout_file)
+    return size
+
+
+def read_frame(path, columns=None, mmap_mode=None):
+    """ Read a dataframe written by write_frame
+
+    Parameters
+    ----------
+    path: str
+        Directory containing the columns
+    columns: list, optional
+        Columns to load. If None, all columns are loaded.
+    mmap_mode: str, optional
+        Passed to numpy.load. Use 'r' to memory map the columns.
+
+    Returns
+    -------
+    pandas.DataFrame
+
+    """
+    with open(os.path.join(path, LAYOUT_FILE)) as layout_file:
+        layout = json.load(layout_file)
+
+    stored = layout['columns']
+    if columns is None:
+        columns = stored
+    missing = set(columns) - set(stored)
+    if missing:
+        raise KeyError("Columns {} not stored in {}".format(sorted(missing), path))
+
+    index = np.load(os.path.join(path, INDEX_FILE), mmap_mode=mmap_mode)
+    data = {col: np.load(os.path.join(path, '{}.npy'.format(stored.index(col))),
+                         mmap_mode=mmap_mode)
+            for col in columns}
+    # Without copy=False the columns are copied into one block, out of the memory map
+    df = pd.DataFrame(data, columns=columns,
+                      index=pd.Index(index, name=layout['index_name']), copy=False)
+    return df
+
+
+def frame_size(path):
+    """ Size on disk of a frame written by write_frame, in bytes
+    """
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class ColumnSegments:
+    """ Append only store of many dataframes, as one raw binary file per column.
+
+    Each appended dataframe is a segment of rows of the column files, located
+    by the offset of its first row in every column it has. Reading a segment
+    through a memory map slices the column files without copying them, and
+    the number of files does not grow with the number of dataframes.
+
+    Parameters
+    ----------
+    path: str
+        Directory of the column files. Created if it does not exist.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._layout = self._read_layout()
+        self._memmaps = {}
+
+    @property
+    def columns(self):
+        return [name for name in self._layout['columns'] if name != INDEX_KEY]
+
+    def append(self, df):
+        """ Append the rows of a dataframe
+
+        Returns
+        -------
+        dict
+            Offset of the first row of the dataframe in each of its columns,
+            the index included under INDEX_KEY
+
+        """
+        _check_columns(df)
+        if df.index.dtype == object:
+            raise ValueError("Can not append a dataframe with an object index")
+        arrays = {INDEX_KEY: np.asarray(df.index.values)}
+        arrays.update((str(col), np.asarray(df[col].values)) for col in df.columns)
+
+        columns = self._layout['columns']
+        offsets = {}
+        for name, values in arrays.items():
+            if name not in columns:
+                columns[name] = {'file': '{}.bin'.format(len(columns)),
+                                 'dtype': values.dtype.str}
+            dtype = np.dtype(columns[name]['dtype'])
+            if not np.can_cast(values.dtype, dtype, casting='same_kind'):
+                raise ValueError("Can not append {} values to the {} column {}"
+                                 .format(values.dtype, dtype, name))
+
+            file_name = os.path.join(self.path, columns[name]['file'])
+            with open(file_name, 'ab') as column_file:
+                offsets[name] = column_file.tell() // dtype.itemsize
+                column_file.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+        if df.index.name is not None:
+            self._layout['index_name'] = df.index.name
+        self._write_layout()
+        self._memmaps = {}
+        return offsets
+
+    def read(self, offsets, length, columns=None, mmap_mode='r'):
+        """ Read the segment of length rows at offsets, as returned by append
+
+        Parameters
+        ----------
+        offsets: dict
+            Offset of the segment in each of its columns
+        length: int
+            Number of rows of the segment
+        columns: list, optional
+            Columns to read. If None, all the columns of the segment are read.
+        mmap_mode: str, optional
+            'r' to slice the memory mapped column files, None to read the
+            rows of the segment into memory
+
+        Returns
+        -------
+        pandas.DataFrame
+
+        """
+        if columns is None:
+            columns = [name for name in offsets if name != INDEX_KEY]
+        missing = set(columns) - set(offsets)
+        if missing:
+            raise KeyError("Columns {} not stored in the segment".format(sorted(missing)))
+
+        index = self._read_column(INDEX_KEY, offsets[INDEX_KEY], length, mmap_mode)
+        data = {name: self._read_column(name, offsets[name], length, mmap_mode)
+                for name in columns}
+        return pd.DataFrame(data, columns=columns, copy=False,
+                            index=pd.Index(index, name=self._layout['index_name']))
+
+    def _read_column(self, name, offset, length, mmap_mode):
+        column = self._layout['columns'][name]
+        dtype = np.dtype(column['dtype'])
+        file_name = os.path.join(self.path, column['file'])
+        if mmap_mode is None:
+            return np.fromfile(file_name, dtype=dtype, count=length,
+                               offset=offset * dtype.itemsize)
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        if name not in self._memmaps:
+            self._memmaps[name] = np.memmap(file_name, dtype=dtype, mode=mmap_mode)
+        return self._memmaps[name][offset:offset + length]
+
+    def _read_layout(self):
+        layout_path = os.path.join(self.path, LAYOUT_FILE)
+        if not os.path.exists(layout_path):
+            return {'index_name': None, 'columns': {}}
+        with open(layout_path) as layout_file:
+            return json.load(layout_file)
+
+    def _write_layout(self):
+        with open(os.path.join(self.path, LAYOUT_FILE), 'w') as layout_file:
+            json.dump(self._layout, layout_file)
+
+
+def fingerprint_data(df):
+    """ Hash the content of a dataframe, including its index
+
+    Parameters
+    ----------
+    df: pandas.DataFrame
+
+    Returns
+    -------
+    str
+        Hex digest identifying the content of the dataframe
+
+    """
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    digest.update(repr(list(df.columns)).encode())
+    return digest.hexdigest()
+
+
+def fingerprint_panel(dates, prices, symbols):
+    """ Hash the content of a dates x symbols panel of prices
+
+    Returns
+    -------
+    str
+        Hex digest identifying the dates, prices and symbols of the panel
+
+    """
+    digest = hashlib.sha256()
+    digest.update(np.asarray(pd.DatetimeIndex(dates).asi8).tobytes())
+    digest.update(np.ascontiguousarray(prices, dtype=float).tobytes())
+    digest.update(repr(list(symbols)).encode())
+    return digest.hexdigest()
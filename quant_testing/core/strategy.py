@@ -1,6 +1,8 @@
 import numpy as np
 
-from .events import ExecutionType, MarketEvent, SignalEvent
+from .cache import class_fingerprint, object_params
+from .events import ExecutionType, MarketEvent, SignalEvent, TargetWeightEvent
+from .indicators import SMA, STD
 
 
 class Strategy:
@@ -9,14 +11,34 @@ class Strategy:
 
     """
 
+    # Whether signals are only sent when they change the position of the portfolio,
+    # i.e. buy when there are no shares and sell when there are.
+    position_gated = False
+
     def __init__(self, events, portfolio):
 
         self.events = events
         self.portfolio = portfolio
 
+        # Indicators read from the registry of the datahandler, if it has one
+        self.required_indicators = []
+
     def generate_strategy(self):
         raise NotImplementedError
 
+    def precompute_signals(self, data):
+        """ Compute the signal of every bar of data at once, before any position gating.
+
+        The signal of bar i only uses the bars before it, as in generate_strategy.
+
+        Returns
+        -------
+        numpy.ndarray
+            ExecutionType of the signal sent at each bar, or 0 for no signal
+
+        """
+        raise NotImplementedError
+
 
 class MovingAverageCrossStrategy(Strategy):
     """ Class for moving average crossing strategy.
@@ -26,11 +48,26 @@ class MovingAverageCrossStrategy(Strategy):
 
     """
 
+    position_gated = True
+
     def __init__(self, events, portfolio, short_window=10, long_window=30):
         super().__init__(events, portfolio)
         self.short_window = short_window
         self.long_window = long_window
 
+        self.short_sma = SMA(short_window)
+        self.long_sma = SMA(long_window)
+        self.required_indicators = [self.short_sma, self.long_sma]
+
+    def precompute_signals(self, data):
+        price_data = np.asarray(data['share_price'], dtype=float)
+        short_sma = self.short_sma.compute(price_data, [])
+        long_sma = self.long_sma.compute(price_data, [])
+
+        # Comparisons with the missing averages of the first bars are False
+        return np.where(short_sma > long_sma, ExecutionType.buy,
+                        np.where(short_sma < long_sma, ExecutionType.sell, 0))
+
     def generate_strategy(self, event):
         """ Get the long and short moving averages
         """
@@ -39,14 +76,21 @@ class MovingAverageCrossStrategy(Strategy):
             return
 
         tick_data = event.signal_data
-        price_bars = tick_data.get_latest_bars(self.long_window)
-        if len(price_bars) < self.long_window:
-            return
+        indicators = getattr(tick_data, 'indicators', None)
+        if indicators is not None:
+            short_sma = indicators.value(self.short_sma)
+            long_sma = indicators.value(self.long_sma)
+            if np.isnan(long_sma):
+                return
+        else:
+            price_bars = tick_data.get_latest_bars(self.long_window)
+            if len(price_bars) < self.long_window:
+                return
 
-        price_data = np.asarray(price_bars['share_price'])
+            price_data = np.asarray(price_bars['share_price'])
 
-        short_sma = np.mean(price_data[-self.short_window:])
-        long_sma = np.mean(price_data[-self.long_window:])
+            short_sma = np.mean(price_data[-self.short_window:])
+            long_sma = np.mean(price_data[-self.long_window:])
 
         if short_sma > long_sma and self.portfolio.shares == 0:
             self.events.put(SignalEvent(tick_data.symbol,
@@ -60,6 +104,13 @@ class MovingAverageCrossStrategy(Strategy):
 
 class BuyAndHold(Strategy):
 
+    position_gated = True
+
+    def precompute_signals(self, data):
+        signals = np.full(len(data), ExecutionType.buy, dtype=int)
+        signals[:1] = 0
+        return signals
+
     def generate_strategy(self, event):
         """ Buy the stock, and hold it.
 
@@ -90,20 +141,45 @@ class BinaryStrategy(Strategy):
         super().__init__(events, portfolio)
         self.lookback = lookback
 
+        # Statistics of the (up to) lookback bars before each bar
+        self.current_price = SMA(1)
+        self.mean_price = SMA(lookback, min_periods=1)
+        self.std_price = STD(lookback, min_periods=1)
+        self.required_indicators = [self.current_price, self.mean_price, self.std_price]
+
+    def precompute_signals(self, data):
+        price_data = np.asarray(data['share_price'], dtype=float)
+        current_price = self.current_price.compute(price_data, [])
+        lower_band = (self.mean_price.compute(price_data, [])
+                      - 2 * self.std_price.compute(price_data, []))
+
+        # Comparisons with the missing statistics of the first bar are False
+        return np.where(current_price > lower_band, ExecutionType.sell,
+                        np.where(current_price < lower_band, ExecutionType.buy, 0))
+
     def generate_strategy(self, event):
         """ Determine the strategy from the data for the portfolio. Returns
         and instruction whether or not to buy the stared
 
         """
         tick_data = event.signal_data
-        data = tick_data.get_latest_bars(self.lookback)
-        if any((data is None, data.empty)):
-            # Can occasionally get none if this is the start of a cycle
-            return None
-        price_data = np.asarray(data['share_price'])
-        current_price = price_data[-1]
-        mean_price = np.mean(price_data)
-        std_price = np.std(price_data)
+        indicators = getattr(tick_data, 'indicators', None)
+        if indicators is not None:
+            current_price = indicators.value(self.current_price)
+            mean_price = indicators.value(self.mean_price)
+            std_price = indicators.value(self.std_price)
+            if np.isnan(current_price):
+                # No bars yet at the start of a cycle
+                return None
+        else:
+            data = tick_data.get_latest_bars(self.lookback)
+            if any((data is None, data.empty)):
+                # Can occasionally get none if this is the start of a cycle
+                return None
+            price_data = np.asarray(data['share_price'])
+            current_price = price_data[-1]
+            mean_price = np.mean(price_data)
+            std_price = np.std(price_data)
 
         if current_price > mean_price - 2 * std_price:
             self.events.put(SignalEvent(tick_data.symbol,
@@ -117,3 +193,127 @@ class BinaryStrategy(Strategy):
 
         else:
             return None
+
+
+class SignalReplayStrategy(Strategy):
+    """ Replay the precomputed signals of a strategy, without recomputing its indicators.
+
+    The signals only depend on the data and the strategy parameters, so they
+    can be computed once (and cached with a SignalCache) and replayed against
+    many portfolio sizing rules or cost models.
+
+    """
+
+    def __init__(self, events, portfolio, strategy, tick_data, signal_cache=None):
+        super().__init__(events, portfolio)
+        self.position_gated = strategy.position_gated
+
+        # The replayed strategy, as a parameter of this one for the BacktestCache key
+        self.source = (class_fingerprint(type(strategy)), tuple(object_params(strategy).items()))
+
+        if signal_cache is not None:
+            signals = signal_cache.get_signals(strategy, tick_data)
+        else:
+            signals = strategy.precompute_signals(tick_data.data)
+        self.signals = {timestamp: signal for timestamp, signal
+                        in zip(tick_data.data.index, signals) if signal}
+
+    def generate_strategy(self, event):
+        if not isinstance(event, MarketEvent):
+            return
+
+        signal_type = self.signals.get(event.timestamp)
+        if signal_type is None:
+            return
+        if self.position_gated:
+            if signal_type == ExecutionType.buy and self.portfolio.shares != 0:
+                return
+            if signal_type == ExecutionType.sell and self.portfolio.shares <= 0:
+                return
+
+        self.events.put(SignalEvent(event.signal_data.symbol,
+                                    event.timestamp,
+                                    signal_type))
+
+
+def cross_sectional_rank(values):
+    """ Rank each row of values across symbols, from 0 (lowest) to 1 (highest).
+
+    Missing values are ranked as NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = np.isfinite(values)
+    order = np.argsort(np.where(valid, values, np.inf), axis=-1)
+    ranks = np.empty_like(values)
+    np.put_along_axis(ranks, order, np.arange(values.shape[-1], dtype=float), axis=-1)
+    count = valid.sum(axis=-1, keepdims=True)
+    ranks = ranks / np.maximum(count - 1, 1)
+    return np.where(valid, ranks, np.nan)
+
+
+def cross_sectional_zscore(values):
+    """ Z-score each row of values across symbols, ignoring missing values
+    """
+    values = np.asarray(values, dtype=float)
+    mean = np.nanmean(values, axis=-1, keepdims=True)
+    std = np.nanstd(values, axis=-1, keepdims=True)
+    return (values - mean) / np.where(std > 0, std, np.nan)
+
+
+class CrossSectionalStrategy(Strategy):
+    """ Base class for strategies over a whole universe of symbols.
+
+    At every rebalance the strategy receives the last lookback rows of a
+    (dates x symbols) price panel, and returns target weights for every symbol
+    in one TargetWeightEvent.
+
+    """
+
+    def __init__(self, events, portfolio, lookback=20, rebalance_period=1):
+        super().__init__(events, portfolio)
+        self.lookback = lookback
+        self.rebalance_period = rebalance_period
+        self.bar_count = 0
+
+    def generate_strategy(self, event):
+        if not isinstance(event, MarketEvent):
+            return
+
+        panel_data = event.signal_data
+        prices = panel_data.get_latest_bars(self.lookback)
+        if len(prices) < self.lookback:
+            return
+
+        self.bar_count += 1
+        if (self.bar_count - 1) % self.rebalance_period:
+            return
+
+        weights = self.compute_weights(prices)
+        self.events.put(TargetWeightEvent(panel_data.symbols,
+                                          event.timestamp,
+                                          weights))
+
+    def compute_weights(self, prices):
+        """ Compute the target weights from a (lookback x symbols) price array
+        """
+        raise NotImplementedError
+
+
+class CrossSectionalMomentum(CrossSectionalStrategy):
+    """ Hold an equal weight in the symbols with the highest return over the
+    lookback, and nothing in the rest.
+
+    """
+
+    def __init__(self, events, portfolio, lookback=20, rebalance_period=1, top_fraction=0.1):
+        super().__init__(events, portfolio, lookback, rebalance_period)
+        self.top_fraction = top_fraction
+
+    def compute_weights(self, prices):
+        momentum = prices[-1] / prices[0] - 1
+        ranks = cross_sectional_rank(momentum)
+
+        selected = ranks >= 1 - self.top_fraction
+        if not selected.any():
+            return np.zeros(len(momentum))
+        return selected / selected.sum()
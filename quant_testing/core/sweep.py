@@ -0,0 +1,127 @@
+""" Parameter sweeps that prune losing configurations early.
+
+Every candidate is run over a short prefix of the history, the best fraction
+is kept and continued to the next, longer, horizon, and so on until the full
+history. Surviving simulations are continued from where they stopped rather
+than restarted.
+"""
+from collections import namedtuple
+import math
+
+import numpy as np
+
+from quant_testing.analytics.performance_metrics import sharpe_ratio
+
+SweepResult = namedtuple('SweepResult', ['params', 'score', 'finish', 'stopped_early', 'eq_curve'])
+
+
+def sharpe_metric(eq_curve):
+    """ Sharpe ratio of the daily returns of an equity curve
+    """
+    return sharpe_ratio(eq_curve, col_name='daily_return')
+
+
+def geometric_milestones(dates, n_rungs, keep_fraction=0.5):
+    """ Finish dates for each rung, growing geometrically up to the last date
+
+    With keep_fraction of 0.5 and 3 rungs the rungs finish a quarter, a half
+    and all of the way through dates, so the total work of every rung is similar.
+    """
+    dates = list(dates)
+    milestones = []
+    for rung in range(n_rungs):
+        fraction = keep_fraction ** (n_rungs - 1 - rung)
+        position = max(int(math.ceil(fraction * len(dates))) - 1, 0)
+        if not milestones or dates[position] > milestones[-1]:
+            milestones.append(dates[position])
+    return milestones
+
+
+class SuccessiveHalving:
+    """ Successive halving scheduler for a sweep over strategy parameters.
+
+    Parameters
+    ----------
+    build_simulator: callable
+        Function of a candidate's parameters, returning a new Simulator
+    candidates: list
+        Parameters of every candidate, e.g. a list of dicts
+    milestones: list
+        Increasing finish timestamps of each rung. The last is the full history.
+    keep_fraction: float, optional
+        Fraction of candidates kept after each rung. Defaults to 0.5.
+    metric: callable, optional
+        Function of an equity curve returning a score, higher is better.
+        Defaults to the Sharpe ratio of the daily returns.
+    summary_metric: str, optional
+        Key of the Simulator.metrics summary used as the score of simulators
+        run with keep_history=False, which have no equity curve. Defaults to
+        the Sharpe ratio.
+    max_drawdown: float, optional
+        If given, candidates are stopped and eliminated once their drawdown
+        exceeds it.
+
+    """
+
+    def __init__(self, build_simulator, candidates, milestones, keep_fraction=0.5,
+                 metric=sharpe_metric, summary_metric='sharpe_ratio', max_drawdown=None):
+        self.build_simulator = build_simulator
+        self.candidates = list(candidates)
+        self.milestones = list(milestones)
+        self.keep_fraction = keep_fraction
+        self.metric = metric
+        self.summary_metric = summary_metric
+        self.max_drawdown = max_drawdown
+
+        self.results = []
+
+    def _score(self, simulator, eq_curve):
+        if simulator.stopped_early:
+            return -np.inf
+        if eq_curve is None:
+            score = simulator.metrics.summary()[self.summary_metric]
+        else:
+            score = self.metric(eq_curve)
+        return -np.inf if np.isnan(score) else score
+
+    def run(self):
+        """ Run the sweep
+
+        Returns
+        -------
+        list
+            SweepResult of every candidate, best first. Candidates eliminated
+            early are scored on the last rung they reached. The equity curve
+            is None for simulators run with keep_history=False.
+
+        """
+        self.results = []
+        survivors = [(params, self.build_simulator(params)) for params in self.candidates]
+
+        for rung, finish in enumerate(self.milestones):
+            scored = []
+            for params, simulator in survivors:
+                simulator._run_simulation(finish, max_drawdown=self.max_drawdown)
+                if simulator.keep_history:
+                    eq_curve = simulator._generate_summary_stats()
+                else:
+                    eq_curve = None
+                result = SweepResult(params, self._score(simulator, eq_curve), finish,
+                                     simulator.stopped_early, eq_curve)
+                scored.append((result, simulator))
+            scored.sort(key=lambda item: item[0].score, reverse=True)
+
+            # Stopped candidates are eliminated whatever their rank
+            live = [item for item in scored if not item[0].stopped_early]
+            stopped = [item for item in scored if item[0].stopped_early]
+
+            if rung == len(self.milestones) - 1:
+                n_keep = 0
+            else:
+                n_keep = max(int(math.ceil(len(scored) * self.keep_fraction)), 1)
+                n_keep = min(n_keep, len(live))
+
+            self.results = [result for result, _ in live[n_keep:] + stopped] + self.results
+            survivors = [(result.params, simulator) for result, simulator in live[:n_keep]]
+
+        return self.results
@@ -0,0 +1,39 @@
+""" Fixtures shared by the tests: the mock csv data, and simulators running on it
+"""
+import queue
+
+import pytest
+
+from quant_testing.core.datahandler import DailyHandler as csv_handler
+from quant_testing.core.execution import NaiveSimulationExecutor
+from quant_testing.core.portfolio import SingleSharePortfolio
+from quant_testing.core.simulation import Simulator
+from quant_testing.core.strategy import MovingAverageCrossStrategy
+from quant_testing.tests.test_csv_data_handler import mock_data, mock_read_file  # noqa: F401
+
+
+@pytest.fixture
+def patch_read_file(monkeypatch):
+    """ Read the mock data in place of a csv file in every DailyHandler
+    """
+    monkeypatch.setattr(csv_handler, 'read_file', mock_read_file)
+
+
+@pytest.fixture
+def build_simulator(mock_data, patch_read_file):
+    """ Factory of simulators of a single share portfolio on the mock data
+
+    The strategy is built from strategy_class and params, and any other
+    keyword arguments are passed to the Simulator.
+    """
+    def build(params=None, strategy_class=MovingAverageCrossStrategy, **kwargs):
+        if params is None:
+            params = {'short_window': 1, 'long_window': 2}
+        events = queue.Queue()
+        datahandler = csv_handler(mock_data, events)
+        portfolio = SingleSharePortfolio(events, 10000, 0, datahandler)
+        strategy = strategy_class(events, portfolio, **params)
+        executor = NaiveSimulationExecutor(portfolio, events, datahandler)
+        return Simulator(portfolio, strategy, datahandler, executor, **kwargs)
+
+    return build
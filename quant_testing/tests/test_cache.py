@@ -0,0 +1,138 @@
+"""Test the backtest result cache
+"""
+from unittest import mock
+import functools
+
+import pandas as pd
+import pytest
+
+from quant_testing.core import cache as cache_module
+from quant_testing.core.cache import BacktestCache, class_fingerprint, function_fingerprint
+from quant_testing.core.simulation import Simulator
+from quant_testing.core.strategy import (BinaryStrategy, MovingAverageCrossStrategy,
+                                         SignalReplayStrategy)
+
+
+def test_cache_hit_and_miss(mock_data, build_simulator, tmp_path):
+    """ Test that an identical backtest is read from the cache, and a different one is not
+    """
+    cache = BacktestCache(str(tmp_path))
+    finish = pd.Timestamp(mock_data[-2, 0])
+
+    first = build_simulator({'short_window': 2, 'long_window': 4}, cache=cache).backtest(finish)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    second = build_simulator({'short_window': 2, 'long_window': 4}, cache=cache).backtest(finish)
+    assert (cache.hits, cache.misses) == (1, 1)
+    pd.testing.assert_frame_equal(first, second, check_freq=False)
+
+    build_simulator({'short_window': 2, 'long_window': 5}, cache=cache).backtest(finish)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache) == 2
+
+
+def test_cache_eviction(mock_data, build_simulator, tmp_path):
+    """ Test that the least recently used entry is evicted when the cache is full
+    """
+    cache = BacktestCache(str(tmp_path))
+    finish = pd.Timestamp(mock_data[-2, 0])
+
+    simulator = build_simulator({'short_window': 2, 'long_window': 4}, cache=cache)
+    first_key = cache.make_key(simulator, finish)
+    simulator.backtest(finish)
+    cache.max_bytes = cache.size
+
+    simulator = build_simulator({'short_window': 2, 'long_window': 5}, cache=cache)
+    second_key = cache.make_key(simulator, finish)
+    simulator.backtest(finish)
+
+    assert first_key not in cache
+    assert second_key in cache
+
+    # The index is persisted on disk
+    assert second_key in BacktestCache(str(tmp_path))
+
+
+@pytest.mark.parametrize("strategy_class, params", [
+    (MovingAverageCrossStrategy, {'short_window': 2, 'long_window': 5}),
+    (BinaryStrategy, {'lookback': 4}),
+])
+def test_cache_key_signal_replay(mock_data, build_simulator, tmp_path, strategy_class, params):
+    """ Test that replayed strategies are keyed on the strategy they replay
+    """
+    cache = BacktestCache(str(tmp_path))
+    finish = pd.Timestamp(mock_data[-2, 0])
+
+    simulator = build_simulator({'short_window': 2, 'long_window': 4})
+    replayed = build_simulator(params, strategy_class)
+    keys = []
+    for strategy in (simulator.strategy, replayed.strategy):
+        simulator.strategy = SignalReplayStrategy(simulator.events, simulator.portfolio,
+                                                  strategy, simulator.datahandler)
+        keys.append(cache.make_key(simulator, finish))
+    assert keys[0] != keys[1]
+
+
+def test_cache_key_package_code(mock_data, build_simulator, tmp_path):
+    """ Test that a change to the code of the package invalidates the cached results
+    """
+    cache = BacktestCache(str(tmp_path))
+    finish = pd.Timestamp(mock_data[-2, 0])
+    simulator = build_simulator()
+
+    key = cache.make_key(simulator, finish)
+    with mock.patch.object(cache_module, 'BACKTEST_MODULES', cache_module.BACKTEST_MODULES[1:]):
+        cache_module.package_fingerprint.cache_clear()
+        try:
+            assert cache.make_key(simulator, finish) != key
+        finally:
+            cache_module.package_fingerprint.cache_clear()
+    assert cache.make_key(simulator, finish) == key
+
+
+def make_commission(rate):
+    return lambda quantity: rate * quantity
+
+
+def flat_commission(quantity, fee=1.0):
+    return fee
+
+
+@pytest.mark.parametrize("first, second", [
+    (make_commission(0.0), make_commission(5.0)),
+    (functools.partial(flat_commission, fee=0.0), functools.partial(flat_commission, fee=5.0)),
+    (flat_commission, functools.partial(flat_commission, fee=5.0)),
+])
+def test_function_fingerprint_bound_values(first, second):
+    """ Test that functions from the same code with different bound values are distinguished
+    """
+    assert function_fingerprint(first) != function_fingerprint(second)
+    assert function_fingerprint(first) == function_fingerprint(first)
+
+
+def test_cache_key_commission_factory(mock_data, build_simulator, tmp_path):
+    """ Test that commission functions made by the same factory with different rates get different keys
+    """
+    cache = BacktestCache(str(tmp_path))
+    finish = pd.Timestamp(mock_data[-2, 0])
+
+    keys = []
+    for rate in (0.0, 5.0):
+        simulator = build_simulator({'short_window': 2, 'long_window': 4}, cache=cache)
+        simulator.portfolio.commission = make_commission(rate)
+        keys.append(cache.make_key(simulator, finish))
+    assert keys[0] != keys[1]
+
+
+def test_class_fingerprint_source():
+    """ Test that classes are fingerprinted by their source, or their name when it is not available
+    """
+    assert class_fingerprint(MovingAverageCrossStrategy) != class_fingerprint(Simulator)
+    assert class_fingerprint(MovingAverageCrossStrategy) == class_fingerprint(MovingAverageCrossStrategy)
+
+    namespace = {}
+    exec("class Strategy:\n    window = 1\n", namespace)
+    first = namespace['Strategy']
+    exec("class Strategy:\n    window = 2\n", namespace)
+    second = namespace['Strategy']
+    assert class_fingerprint(first) == class_fingerprint(second)
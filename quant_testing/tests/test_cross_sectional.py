@@ -0,0 +1,127 @@
+"""Test the cross-sectional strategies, run over a panel of symbols
+"""
+import queue
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_testing.core.cache import BacktestCache, data_fingerprint
+from quant_testing.core.datahandler import PanelHandler
+from quant_testing.core.events import ExecutionType, TargetWeightEvent
+from quant_testing.core.execution import NaivePanelExecutor
+from quant_testing.core.portfolio import PanelPortfolio
+from quant_testing.core.simulation import Simulator
+from quant_testing.core.strategy import (CrossSectionalMomentum, cross_sectional_rank,
+                                         cross_sectional_zscore)
+
+
+def mock_panel(events):
+    """ Four symbols with constant growth rates, the last one missing a price
+    """
+    dates = pd.date_range('2017-08-01', periods=10)
+    growth = np.array([1.00, 1.01, 1.02, 1.03])
+    prices = 10 * growth ** np.arange(10)[:, None]
+    prices[2, 3] = np.nan
+    return PanelHandler(prices, dates, ['A', 'B', 'C', 'D'], events)
+
+
+def test_rank_and_zscore():
+    values = np.array([[3., 1., np.nan, 2.]])
+    np.testing.assert_allclose(cross_sectional_rank(values), [[1, 0, np.nan, 0.5]])
+    np.testing.assert_allclose(cross_sectional_zscore(values),
+                               [[np.sqrt(1.5), -np.sqrt(1.5), np.nan, 0]])
+
+
+def test_panel_handler():
+    events = queue.Queue()
+    panel = mock_panel(events)
+    assert panel.get_latest_bars(3).shape == (0, 4)
+
+    for _ in range(4):
+        panel.update_bars()
+    assert events.qsize() == 4
+    assert panel.current_timestamp == pd.Timestamp('2017-08-04')
+    np.testing.assert_allclose(panel.get_latest_bars(2), panel.prices[1:3])
+
+
+def test_momentum_weights():
+    events = queue.Queue()
+    panel = mock_panel(events)
+    strategy = CrossSectionalMomentum(events, None, lookback=3, top_fraction=0.5)
+
+    for _ in range(4):
+        panel.update_bars()
+    strategy.generate_strategy(events.queue[-1])
+
+    signal = events.queue[-1]
+    assert isinstance(signal, TargetWeightEvent)
+    assert signal.signal_type == ExecutionType.rebalance
+    # The last symbol has no price at the end of the window, so is not selected
+    np.testing.assert_allclose(signal.weights, [0, 0.5, 0.5, 0])
+
+
+def test_panel_backtest():
+    """ Test that a full backtest rebalances into the strongest symbols
+    """
+    events = queue.Queue()
+    panel = mock_panel(events)
+    portfolio = PanelPortfolio(events, 10000, panel)
+    strategy = CrossSectionalMomentum(events, portfolio, lookback=3, top_fraction=0.5)
+    executor = NaivePanelExecutor(portfolio, events, panel)
+    simulator = Simulator(portfolio, strategy, panel, executor)
+
+    eq_curve = simulator.backtest(panel.dates[-1])
+    assert simulator.fill_count > 0
+    assert portfolio.shares[0] == 0 and portfolio.shares[1] == 0
+    assert portfolio.shares[2] > 0 and portfolio.shares[3] > 0
+    assert portfolio.cash >= 0
+    assert eq_curve['equity_value'].iloc[-1] > 10000
+    assert eq_curve['shares'].iloc[-1] == 2
+
+
+def test_panel_backtest_missing_price():
+    """ Test that a held symbol missing a price is valued at its last price
+    """
+    events = queue.Queue()
+    panel = mock_panel(events)
+    panel.prices[7, 3] = np.nan
+    portfolio = PanelPortfolio(events, 10000, panel)
+    strategy = CrossSectionalMomentum(events, portfolio, lookback=3, top_fraction=0.5)
+    executor = NaivePanelExecutor(portfolio, events, panel)
+    simulator = Simulator(portfolio, strategy, panel, executor)
+
+    eq_curve = simulator.backtest(panel.dates[-1])
+    assert eq_curve['shares'].iloc[-1] == 2
+    assert eq_curve['drawdown'].max() < 0.01
+    np.testing.assert_array_equal(panel.get_latest_valid_prices(), panel.prices[-2])
+
+
+def test_panel_backtest_cached(tmp_path):
+    """ Test that the equity curve of a panel backtest is cached on the prices of the panel
+    """
+    cache = BacktestCache(str(tmp_path))
+
+    def backtest(scale=1):
+        events = queue.Queue()
+        panel = mock_panel(events)
+        panel.prices[5:] *= scale
+        portfolio = PanelPortfolio(events, 10000, panel)
+        strategy = CrossSectionalMomentum(events, portfolio, lookback=3, top_fraction=0.5)
+        executor = NaivePanelExecutor(portfolio, events, panel)
+        simulator = Simulator(portfolio, strategy, panel, executor, cache=cache)
+        return simulator.backtest(panel.dates[-1])
+
+    eq_curve = backtest()
+    pd.testing.assert_frame_equal(backtest(), eq_curve)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The same symbols with different prices are a different backtest
+    scaled_eq_curve = backtest(scale=0.5)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert scaled_eq_curve['equity_value'].iloc[-1] < eq_curve['equity_value'].iloc[-1]
+
+
+def test_data_fingerprint_without_data():
+    with pytest.raises(ValueError):
+        data_fingerprint(object())
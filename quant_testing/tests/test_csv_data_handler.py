@@ -113,3 +113,103 @@ def test_update_bars_get_latest_bars(mock_data, position, points):
     # Check that a single update goes in the right position
     test_datahandler.update_bars()
     assert events.qsize() == 1
+
+
+@mock.patch.object(csv_handler, 'read_file', mock_read_file)
+@pytest.mark.parametrize("timeframe, rule", [('W', 'W-SUN'), ('M', 'ME'), (3, None)])
+@pytest.mark.parametrize("points", [1, 2, 10])
+def test_get_latest_bars_timeframe(mock_data, timeframe, rule, points):
+    """ Test that the derived timeframes match resampling the bars seen so far
+    """
+    events = queue.Queue()
+    test_datahandler = csv_handler(mock_data, events)
+    test_datahandler.add_timeframe(timeframe)
+
+    for position in range(len(mock_data)):
+        test_datahandler.update_bars()
+
+        seen = generate_dataframe(mock_data[:position])
+        seen.index = pd.to_datetime(seen.index)
+        if rule is None:
+            groups = seen.groupby(np.arange(len(seen)) // timeframe)
+        else:
+            groups = seen.resample(rule)
+        expected = groups.agg({'Open': 'first', 'High': 'max', 'Low': 'min',
+                               'share_price': 'last', 'Volume': 'sum'}).dropna()
+        expected = expected.tail(points).reset_index(drop=True)
+
+        test_dataframe = test_datahandler.get_latest_bars(points, timeframe=timeframe)
+        pd.testing.assert_frame_equal(test_dataframe, expected, check_dtype=False)
+
+
+@mock.patch.object(csv_handler, 'read_file', mock_read_file)
+def test_add_timeframe_mid_way(mock_data):
+    """ Test that a timeframe added after the start includes the bars already seen
+    """
+    events = queue.Queue()
+    current_timestamp = pd.to_datetime(mock_data[7, 0])
+    test_datahandler = csv_handler(mock_data, events, current_timestamp=current_timestamp)
+
+    weekly = test_datahandler.get_latest_bars(5, timeframe='W')
+    assert list(weekly['Open']) == [930.34, 929.06]
+    assert list(weekly['share_price']) == [927.96, 914.39]
+
+    # Bars already in the timeframe are not added again as the data is updated
+    while test_datahandler.update_bars() is not False:
+        pass
+    seen = generate_dataframe(mock_data[:-1])
+    seen.index = pd.to_datetime(seen.index)
+    expected = seen.resample('W-SUN').agg({'Open': 'first', 'High': 'max', 'Low': 'min',
+                                           'share_price': 'last', 'Volume': 'sum'})
+    pd.testing.assert_frame_equal(test_datahandler.get_latest_bars(10, timeframe='W'),
+                                  expected.reset_index(drop=True), check_dtype=False)
+
+    with pytest.raises(ValueError):
+        test_datahandler.add_timeframe('D')
+
+
+@mock.patch.object(csv_handler, 'read_file', mock_read_file)
+@pytest.mark.parametrize("points", [0, 1, 3])
+@pytest.mark.parametrize("inclusive", [False, True])
+def test_get_bars_asof(mock_data, points, inclusive):
+    """ Test that the batched as-of lookup matches get_data_points at every query
+    """
+    events = queue.Queue()
+    test_datahandler = csv_handler(mock_data, events)
+
+    queries = pd.to_datetime(['2017-08-01', '2017-08-05', '2017-08-03', '2017-08-30',
+                              '2017-09-30', '2017-08-14 12:00:00'], format='ISO8601')
+    test_windows = test_datahandler.get_bars_asof(queries, points, inclusive=inclusive)
+    assert test_windows.shape == (len(queries), points)
+
+    for query, window in zip(queries, test_windows):
+        timestamp = query + pd.Timedelta(1, 'ns') if inclusive else query
+        expected = np.asarray(test_datahandler.get_data_points(timestamp, points)['share_price'])
+        expected = np.concatenate([np.full(points - len(expected), np.nan), expected])
+        np.testing.assert_array_equal(window, expected)
+
+
+@mock.patch.object(csv_handler, 'read_file', mock_read_file)
+def test_get_prices_asof(mock_data):
+    events = queue.Queue()
+    test_datahandler = csv_handler(mock_data, events)
+
+    queries = pd.to_datetime(['2017-08-03', '2017-08-05', '2017-08-07'])
+    np.testing.assert_array_equal(test_datahandler.get_prices_asof(queries),
+                                  [np.nan, 927.96, 927.96])
+    np.testing.assert_array_equal(test_datahandler.get_prices_asof(queries, column='Open',
+                                                                   inclusive=True),
+                                  [930.34, 926.75, 929.06])
+
+
+@mock.patch.object(csv_handler, 'read_file', mock_read_file)
+def test_get_latest_prices(mock_data):
+    """ Test that the latest prices are the share price of the latest bar
+    """
+    events = queue.Queue()
+    test_datahandler = csv_handler(mock_data, events)
+    assert len(test_datahandler.get_latest_prices()) == 0
+
+    while test_datahandler.update_bars() is not False:
+        np.testing.assert_array_equal(test_datahandler.get_latest_prices(),
+                                      test_datahandler.get_latest_bars(1)['share_price'])
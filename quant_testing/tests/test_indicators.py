@@ -0,0 +1,103 @@
+"""Test the indicators shared through the datahandler registry
+"""
+from unittest import mock
+import queue
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_testing.core import indicators
+from quant_testing.core.datahandler import DailyHandler as csv_handler
+from quant_testing.core.indicators import SMA, STD, ZScore
+from quant_testing.core.strategy import BinaryStrategy, MovingAverageCrossStrategy
+from quant_testing.tests.test_strategy import STRATEGIES, UngatedPortfolio
+
+
+@pytest.mark.usefixtures('patch_read_file')
+@pytest.mark.parametrize("window, min_periods", [(1, None), (4, None), (4, 1), (30, 2)])
+def test_indicator_values(mock_data, window, min_periods):
+    """ Test that the registry values match statistics of the latest bars at every step
+    """
+    events = queue.Queue()
+    test_datahandler = csv_handler(mock_data, events)
+    registry = test_datahandler.indicators
+    sma = SMA(window, min_periods=min_periods)
+    std = STD(window, min_periods=min_periods)
+
+    for _ in range(len(mock_data)):
+        test_datahandler.update_bars()
+        bars = np.asarray(test_datahandler.get_latest_bars(window)['share_price'])
+        if len(bars) < sma.min_periods or len(bars) == 0:
+            assert np.isnan(registry.value(sma))
+            continue
+        assert registry.value(sma) == np.mean(bars)
+        assert registry.value(std) == np.std(bars)
+
+
+@pytest.mark.usefixtures('patch_read_file')
+def test_registry_shares_indicators(mock_data):
+    test_datahandler = csv_handler(mock_data, queue.Queue())
+    registry = test_datahandler.indicators
+
+    strategies = [MovingAverageCrossStrategy(None, None, short, long)
+                  for short in (2, 3, 5) for long in (5, 10)]
+    strategies += [BinaryStrategy(None, None, lookback) for lookback in (5, 10)]
+    for strategy in strategies:
+        for indicator in strategy.required_indicators:
+            registry.register(indicator)
+
+    # SMA 2, 3, 5, 10, the last price, and partial-window SMA and STD of 5 and 10
+    assert len(registry) == 9
+
+    zscore = ZScore(5, min_periods=1)
+    registry.register(zscore)
+    assert len(registry) == 10
+    assert SMA(5, min_periods=1) in registry and STD(5, min_periods=1) in registry
+
+
+def test_simulator_registers_indicators(build_simulator):
+    """ Test that a simulator registers the indicators of its strategy up front
+    """
+    simulator = build_simulator({'short_window': 2, 'long_window': 5})
+    registry = simulator.datahandler.indicators
+    assert len(registry) == 2
+    assert all(indicator in registry for indicator in simulator.strategy.required_indicators)
+
+
+def test_simulators_share_indicators(mock_data, build_simulator):
+    """ Test that simulators on the same data compute each indicator once between them
+    """
+    finish = pd.Timestamp(mock_data[-1, 0])
+    with mock.patch.dict(indicators._shared_series, clear=True), \
+            mock.patch.object(SMA, 'compute', autospec=True, side_effect=SMA.compute) as compute:
+        eq_curves = [build_simulator({'short_window': 2, 'long_window': long_window})
+                     .backtest(finish) for long_window in (4, 5, 4)]
+    assert sorted(call.args[0].window for call in compute.call_args_list) == [2, 4, 5]
+
+    expected = build_simulator({'short_window': 2, 'long_window': 4})
+    expected.datahandler.indicators._store = {}
+    pd.testing.assert_frame_equal(expected.backtest(finish), eq_curves[2])
+
+
+@pytest.mark.usefixtures('patch_read_file')
+@pytest.mark.parametrize("strategy_class, params", STRATEGIES)
+def test_strategy_with_and_without_registry(mock_data, strategy_class, params):
+    """ Test that the strategies send the same signals from the registry as from the bars
+    """
+    def signals(use_registry):
+        events = queue.Queue()
+        test_datahandler = csv_handler(mock_data, events)
+        if not use_registry:
+            test_datahandler.indicators = None
+        strategy = strategy_class(events, UngatedPortfolio(0), **params)
+
+        sent = []
+        for _ in range(len(mock_data)):
+            test_datahandler.update_bars()
+            strategy.generate_strategy(events.get())
+            sent.append([event.signal_type for event in list(events.queue)])
+            events.queue.clear()
+        return sent
+
+    assert signals(True) == signals(False)
@@ -0,0 +1,129 @@
+"""Test recording a simulation to a journal, and replaying it
+"""
+import queue
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_testing.core.cache import BacktestCache
+from quant_testing.core.datahandler import DailyHandler
+from quant_testing.core.execution import NaiveSimulationExecutor
+from quant_testing.core.events import ExecutionType, OrderEvent
+from quant_testing.core.journal import (EventJournal, JournalReplayHandler, read_journal,
+                                        MARKET, SIGNAL, ORDER, FILL)
+from quant_testing.core.portfolio import SingleSharePortfolio
+from quant_testing.core.simulation import Simulator
+from quant_testing.core.strategy import MovingAverageCrossStrategy
+
+
+def mock_comission(num_shares):
+    return 10
+
+
+def replay(file_path):
+    events = queue.Queue()
+    replay_handler = JournalReplayHandler(file_path, events)
+    portfolio = SingleSharePortfolio(events, 10000, 0, replay_handler)
+    executor = NaiveSimulationExecutor(portfolio, events, replay_handler)
+    return Simulator(portfolio, None, replay_handler, executor)
+
+
+@pytest.mark.parametrize("windows", [(1, 2), (2, 4)])
+def test_record_and_replay(mock_data, build_simulator, tmp_path, windows):
+    finish = pd.Timestamp(mock_data[-1, 0])
+    file_path = str(tmp_path / 'journal.bin')
+
+    with EventJournal(file_path, buffer_size=8) as journal:
+        simulator = build_simulator(dict(zip(('short_window', 'long_window'), windows)),
+                                    journal=journal)
+        eq_curve = simulator.backtest(finish)
+
+    records = read_journal(file_path)
+    assert isinstance(records, np.memmap)
+    assert len(records) == journal.count
+    assert np.sum(records['kind'] == MARKET) == len(eq_curve)
+    assert np.sum(records['kind'] == SIGNAL) == simulator.signal_count
+    assert np.sum(records['kind'] == ORDER) == simulator.order_count
+    assert np.sum(records['kind'] == FILL) == simulator.fill_count > 0
+    np.testing.assert_allclose(records['commission'][records['kind'] == FILL].sum(),
+                               simulator.cumulative_comission)
+
+    # Every record is stamped with the bar it was processed on
+    market = records['kind'] == MARKET
+    bar_of_record = np.maximum.accumulate(np.where(market, np.arange(len(records)), 0))
+    np.testing.assert_array_equal(records['timestamp'],
+                                  records['timestamp'][bar_of_record])
+    assert list(pd.to_datetime(records['timestamp'][market])) == list(eq_curve.index)
+
+    # Replaying with the same portfolio gives the same run
+    replayed = replay(file_path)
+    pd.testing.assert_frame_equal(replayed.backtest(finish), eq_curve, check_index_type=False)
+    assert replayed.signal_count == simulator.signal_count
+
+    # Replaying with a different commission only changes the costs
+    events = queue.Queue()
+    replay_handler = JournalReplayHandler(file_path, events)
+    portfolio = SingleSharePortfolio(events, 10000, 0, replay_handler,
+                                     commission_calc=mock_comission)
+    executor = NaiveSimulationExecutor(portfolio, events, replay_handler)
+    replayed = Simulator(portfolio, None, replay_handler, executor)
+    replayed.backtest(finish)
+    assert replayed.cumulative_comission == 10 * replayed.fill_count
+
+
+def test_basket_orders_rejected(tmp_path):
+    order = OrderEvent(None, 'MKT_ORDER', np.array([1., 2.]), ExecutionType.rebalance)
+    with EventJournal(str(tmp_path / 'journal.bin')) as journal:
+        with pytest.raises(ValueError):
+            journal.record(order, pd.Timestamp('2017-08-03'))
+        assert journal.count == 0
+
+
+def test_replay_faster_than_run(monkeypatch, tmp_path):
+    """ Test that a replay serves the recorded prices without building bars, and is
+    faster than the run it replays
+    """
+    dates = pd.bdate_range('2010-01-04', periods=2000)
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, len(dates))))
+    data = pd.DataFrame({'share_price': prices}, index=dates)
+
+    def read_file(self, file_path):
+        self.data = data
+    monkeypatch.setattr(DailyHandler, 'read_file', read_file)
+
+    def run(journal=None):
+        events = queue.Queue()
+        datahandler = DailyHandler('SYNTHETIC', events)
+        portfolio = SingleSharePortfolio(events, 10000, 0, datahandler)
+        strategy = MovingAverageCrossStrategy(events, portfolio, short_window=5, long_window=20)
+        executor = NaiveSimulationExecutor(portfolio, events, datahandler)
+        return Simulator(portfolio, strategy, datahandler, executor,
+                         journal=journal).backtest(dates[-1])
+
+    file_path = str(tmp_path / 'journal.bin')
+    with EventJournal(file_path) as journal:
+        eq_curve = run(journal)
+
+    def no_bars(*args):
+        raise AssertionError("The replay should not build bars")
+    monkeypatch.setattr(JournalReplayHandler, 'get_latest_bars', no_bars)
+
+    start = time.perf_counter()
+    replayed = replay(file_path).backtest(dates[-1])
+    replay_time = time.perf_counter() - start
+    pd.testing.assert_frame_equal(replayed, eq_curve, check_index_type=False)
+
+    start = time.perf_counter()
+    run()
+    run_time = time.perf_counter() - start
+    assert replay_time < run_time
+
+
+def test_journal_with_cache_rejected(build_simulator, tmp_path):
+    """ Test that a cached simulator can not be journalled, as cache hits do not run
+    """
+    with EventJournal(str(tmp_path / 'journal.bin')) as journal:
+        with pytest.raises(ValueError):
+            build_simulator(journal=journal, cache=BacktestCache(str(tmp_path / 'cache')))
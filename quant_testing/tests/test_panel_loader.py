@@ -0,0 +1,68 @@
+"""Test the bulk loading of symbol files into a panel
+"""
+import queue
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_testing.core.datahandler import GoogleCSV, PanelHandler
+from quant_testing.core.panel_loader import load_panel, read_panel
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    """ Two google finance csv files, with different missing dates
+    """
+    pd.DataFrame({'Date': ['4-Aug-17', '3-Aug-17', '7-Aug-17'],
+                  'Close': [2.0, 1.0, 3.0]}).to_csv(tmp_path / 'AAA.csv', index=False)
+    pd.DataFrame({'Date': ['4-Aug-17', '8-Aug-17'],
+                  'Close': [20.0, 40.0]}).to_csv(tmp_path / 'BBB.csv', index=False)
+    return tmp_path
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_load_panel_ffill(csv_dir, use_processes):
+    panel = load_panel(str(csv_dir), use_processes=use_processes, max_workers=2)
+
+    assert panel.symbols == ['AAA', 'BBB']
+    assert list(panel.dates) == list(pd.to_datetime(['2017-08-03', '2017-08-04',
+                                                     '2017-08-07', '2017-08-08']))
+    np.testing.assert_array_equal(panel.prices, [[1, np.nan], [2, 20], [3, 20], [3, 40]])
+    np.testing.assert_array_equal(panel.missing, [[False, True], [False, False],
+                                                  [False, True], [True, False]])
+
+
+def test_load_panel_mask(csv_dir):
+    panel = load_panel([str(csv_dir / 'BBB.csv'), str(csv_dir / 'AAA.csv')], fill='mask')
+
+    assert panel.symbols == ['BBB', 'AAA']
+    np.testing.assert_array_equal(panel.prices, [[np.nan, 1], [20, 2], [np.nan, 3], [40, np.nan]])
+
+    with pytest.raises(ValueError):
+        load_panel(str(csv_dir), fill='bfill')
+
+
+def test_save_and_read_panel(csv_dir, tmp_path):
+    """ Test that a saved panel is read back memory mapped, and feeds a PanelHandler
+    """
+    file_path = str(tmp_path / 'panel.bin')
+    panel = load_panel(str(csv_dir), save_path=file_path)
+
+    stored = read_panel(file_path)
+    assert isinstance(stored.prices, np.memmap)
+    assert stored.symbols == panel.symbols
+    assert stored.dates.equals(panel.dates)
+    np.testing.assert_array_equal(stored.prices, panel.prices)
+    np.testing.assert_array_equal(stored.missing, panel.missing)
+
+    handler = PanelHandler.from_file(file_path, queue.Queue())
+    handler.update_bars()
+    handler.update_bars()
+    np.testing.assert_array_equal(handler.get_latest_bars(1), [[1, np.nan]])
+
+
+def test_google_csv_dates(csv_dir):
+    handler = GoogleCSV(str(csv_dir / 'AAA.csv'), queue.Queue())
+    assert list(handler.data['share_price']) == [1.0, 2.0, 3.0]
+    assert handler.current_timestamp == pd.Timestamp('2017-08-03')
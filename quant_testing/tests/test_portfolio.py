@@ -1,6 +1,7 @@
 """Test the portfolio classes
 """
 import queue
+import numpy as np
 import pytest
 import pandas as pd
 
@@ -15,6 +16,9 @@ class MockTickdata:
         return pd.DataFrame({'share_price': 10, 'timestamp': 0},
                             columns=['share_price', 'timestamp'], index=[0])
 
+    def get_latest_prices(*args):
+        return np.array([10.])
+
 
 def test_determine_move():
     events = queue.Queue()
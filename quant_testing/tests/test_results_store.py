@@ -0,0 +1,111 @@
+"""Test the results store
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_testing.analytics.results_store import ResultsStore
+
+
+def mock_eq_curve(value):
+    dates = pd.date_range('2017-08-01', periods=5, name='date')
+    return pd.DataFrame({'equity_value': np.full(5, value, dtype=float),
+                         'drawdown': np.zeros(5)}, index=dates)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    for long_window in [20, 40, 60, 80]:
+        store.append(mock_eq_curve(long_window), 'MovingAverageCrossStrategy',
+                     params={'short_window': 10, 'long_window': long_window}, data_id='GOOG')
+    store.append(mock_eq_curve(1), 'BinaryStrategy', params={'lookback': 10}, data_id='GOOG')
+    return store
+
+
+def test_runs_filters(store):
+    """ Test that the runs are filtered on the strategy partition and parameters
+    """
+    assert store.strategies == ['BinaryStrategy', 'MovingAverageCrossStrategy']
+    assert len(store.runs()) == 5
+
+    runs = store.runs('MovingAverageCrossStrategy', [('long_window', '>', 50)])
+    assert sorted(runs['params.long_window']) == [60, 80]
+
+    assert len(store.runs(filters=[('lookback', '==', 10)])) == 1
+    assert len(store.runs(filters=[('data_id', '==', 'AAPL')])) == 0
+
+
+def test_load_columns(store):
+    """ Test that only the matching runs and requested columns are loaded
+    """
+    eq_curves = store.load('MovingAverageCrossStrategy', [('long_window', '>', 50)],
+                           columns=['equity_value'])
+    assert list(eq_curves.columns) == ['equity_value']
+    assert sorted(eq_curves['equity_value'].unique()) == [60, 80]
+    assert eq_curves.index.names == ['run_id', 'date']
+
+    run, eq_curve = next(store.iter_runs('BinaryStrategy'))
+    assert run['params'] == {'lookback': 10}
+    assert list(eq_curve.columns) == ['equity_value', 'drawdown']
+
+
+def is_memory_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def test_iter_runs_memory_mapped(store):
+    """ Test that the columns of the runs are read through a memory map, not copied
+    """
+    for run, eq_curve in store.iter_runs('MovingAverageCrossStrategy'):
+        assert all(is_memory_mapped(eq_curve[col].to_numpy()) for col in eq_curve.columns)
+
+    run, eq_curve = next(store.iter_runs('BinaryStrategy', mmap_mode=None))
+    assert not is_memory_mapped(eq_curve['equity_value'].to_numpy())
+
+
+def test_object_columns_rejected(store):
+    eq_curve = mock_eq_curve(1)
+    eq_curve['shares'] = [np.zeros(2) for _ in range(len(eq_curve))]
+    with pytest.raises(ValueError):
+        store.append(eq_curve, 'BinaryStrategy', params={'lookback': 20}, data_id='GOOG')
+
+
+def test_runs_share_column_files(store, tmp_path):
+    """ Test that appending runs adds segments to the same files, not new files
+    """
+    partition = tmp_path / 'strategy=MovingAverageCrossStrategy'
+    store.runs()
+    n_files = sum(len(files) for _, _, files in os.walk(partition))
+    for long_window in range(100, 150):
+        store.append(mock_eq_curve(long_window), 'MovingAverageCrossStrategy',
+                     params={'short_window': 10, 'long_window': long_window}, data_id='GOOG')
+    store.runs()
+    assert sum(len(files) for _, _, files in os.walk(partition)) == n_files
+
+    run, eq_curve = next(store.iter_runs('MovingAverageCrossStrategy',
+                                         [('long_window', '==', 120)]))
+    pd.testing.assert_frame_equal(eq_curve, mock_eq_curve(120), check_freq=False)
+
+
+def test_metadata_updated_from_log(store):
+    """ Test that runs appended after a query are added to the columnar metadata
+    """
+    assert len(store.runs('BinaryStrategy')) == 1
+    store.append(mock_eq_curve(2), 'BinaryStrategy', params={'lookback': 20},
+                 data_id='AAPL', note='rerun')
+
+    runs = store.runs('BinaryStrategy', [('data_id', 'in', ['AAPL'])])
+    assert list(runs['params.lookback']) == [20]
+    assert list(runs['note']) == ['rerun']
+    assert len(store.runs('BinaryStrategy', [('note', '==', 'rerun')])) == 1
+
+    run, _ = next(store.iter_runs('BinaryStrategy', [('lookback', '<', 15)]))
+    assert run['params'] == {'lookback': 10}
+    assert 'note' not in run
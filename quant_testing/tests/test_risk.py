@@ -0,0 +1,68 @@
+"""Test the incremental risk engine
+"""
+import queue
+
+import numpy as np
+import pytest
+from statistics import NormalDist
+
+from quant_testing.core.execution import NaivePanelExecutor
+from quant_testing.core.portfolio import PanelPortfolio
+from quant_testing.core.risk import RiskEngine
+from quant_testing.core.simulation import Simulator
+from quant_testing.core.strategy import CrossSectionalMomentum
+from quant_testing.tests.test_cross_sectional import mock_panel
+
+
+@pytest.fixture
+def prices():
+    random = np.random.default_rng(0)
+    return 100 * np.cumprod(1 + 0.01 * random.standard_normal((40, 3)), axis=0)
+
+
+def test_covariance_matches_full_recompute(prices):
+    decay = 0.9
+    engine = RiskEngine(3, decay=decay, window=10)
+    for row in prices:
+        engine.update(row)
+
+    returns = prices[1:] / prices[:-1] - 1
+    expected = np.outer(returns[0], returns[0])
+    for row in returns[1:]:
+        expected = decay * expected + (1 - decay) * np.outer(row, row)
+
+    np.testing.assert_allclose(engine.covariance, expected)
+    np.testing.assert_allclose(engine.returns, returns[-10:])
+
+
+def test_risk_measures(prices):
+    engine = RiskEngine(3, window=20)
+    weights = np.array([0.5, 0.3, 0.2])
+    for row in prices:
+        engine.update(row, weights)
+
+    volatility = np.sqrt(weights @ engine.covariance @ weights)
+    snapshot = engine.latest
+    assert snapshot['volatility'] == pytest.approx(volatility)
+    assert snapshot['parametric_var'] == pytest.approx(-NormalDist().inv_cdf(0.05) * volatility)
+    assert snapshot['parametric_cvar'] > snapshot['parametric_var']
+    assert snapshot['risk_contributions'].sum() == pytest.approx(volatility)
+
+    portfolio_returns = engine.returns @ weights
+    assert snapshot['historical_var'] == pytest.approx(-np.quantile(portfolio_returns, 0.05))
+    assert snapshot['historical_cvar'] >= snapshot['historical_var']
+
+
+def test_simulator_updates_risk():
+    events = queue.Queue()
+    panel = mock_panel(events)
+    portfolio = PanelPortfolio(events, 10000, panel)
+    strategy = CrossSectionalMomentum(events, portfolio, lookback=3, top_fraction=0.5)
+    executor = NaivePanelExecutor(portfolio, events, panel)
+    risk_engine = RiskEngine(len(panel.symbols))
+    simulator = Simulator(portfolio, strategy, panel, executor, risk_engine=risk_engine)
+
+    simulator.backtest(panel.dates[-1])
+    assert risk_engine.count == len(panel.dates) - 3
+    assert risk_engine.latest['volatility'] > 0
+    np.testing.assert_allclose(risk_engine.latest['risk_contributions'][:2], 0)
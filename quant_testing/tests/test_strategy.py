@@ -0,0 +1,103 @@
+"""Test the strategies, and replaying their precomputed signals
+"""
+from unittest import mock
+import queue
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_testing.core.cache import SignalCache
+from quant_testing.core import datahandler as datahandler_module
+from quant_testing.core.datahandler import DailyHandler as csv_handler
+from quant_testing.core.events import SignalEvent
+from quant_testing.core.strategy import (BinaryStrategy, BuyAndHold, MovingAverageCrossStrategy,
+                                         SignalReplayStrategy)
+
+
+class UngatedPortfolio:
+    """ Portfolio that lets every signal of a position gated strategy through
+    """
+    def __init__(self, shares):
+        self.shares = shares
+
+
+STRATEGIES = [(MovingAverageCrossStrategy, {'short_window': 2, 'long_window': 5}),
+              (MovingAverageCrossStrategy, {'short_window': 3, 'long_window': 3}),
+              (BuyAndHold, {}),
+              (BinaryStrategy, {'lookback': 4}),
+              (BinaryStrategy, {'lookback': 30})]
+
+
+def event_signals(strategy_class, params, mock_data, shares):
+    """ Signals sent by a strategy run bar by bar through the datahandler
+    """
+    events = queue.Queue()
+    datahandler = csv_handler(mock_data, events)
+    strategy = strategy_class(events, UngatedPortfolio(shares), **params)
+
+    signals = np.zeros(len(datahandler.data), dtype=int)
+    for position in range(len(datahandler.data)):
+        datahandler.update_bars()
+        strategy.generate_strategy(events.get())
+        while not events.empty():
+            event = events.get()
+            assert isinstance(event, SignalEvent)
+            signals[position] = event.signal_type
+    return signals
+
+
+@pytest.mark.usefixtures('patch_read_file')
+@pytest.mark.parametrize("strategy_class, params", STRATEGIES)
+def test_precompute_signals(mock_data, strategy_class, params):
+    """ Test that the precomputed signals match the signals sent bar by bar
+    """
+    datahandler = csv_handler(mock_data, queue.Queue())
+    strategy = strategy_class(None, None, **params)
+    signals = strategy.precompute_signals(datahandler.data)
+
+    if strategy.position_gated:
+        buys = event_signals(strategy_class, params, mock_data, shares=0)
+        sells = event_signals(strategy_class, params, mock_data, shares=1)
+        expected = np.where(buys > 0, buys, sells)
+    else:
+        expected = event_signals(strategy_class, params, mock_data, shares=0)
+    np.testing.assert_array_equal(signals, expected)
+
+
+@pytest.mark.parametrize("strategy_class, params", STRATEGIES)
+def test_signal_replay(mock_data, build_simulator, strategy_class, params):
+    """ Test that replaying cached signals gives the same backtest as running the strategy
+    """
+    finish = pd.Timestamp(mock_data[-1, 0])
+    signal_cache = SignalCache()
+
+    def run(replay):
+        simulator = build_simulator(params, strategy_class)
+        if replay:
+            simulator.strategy = SignalReplayStrategy(simulator.events, simulator.portfolio,
+                                                      simulator.strategy, simulator.datahandler,
+                                                      signal_cache)
+        return simulator, simulator.backtest(finish)
+
+    simulator, eq_curve = run(replay=False)
+    for _ in range(2):
+        replay_simulator, replay_eq_curve = run(replay=True)
+        pd.testing.assert_frame_equal(eq_curve, replay_eq_curve)
+        assert replay_simulator.signal_count == simulator.signal_count
+
+    assert (signal_cache.hits, signal_cache.misses) == (1, 1)
+
+
+def test_signal_cache_hashes_data_once(build_simulator):
+    """ Test that the data of a handler is hashed once, however many signals are looked up
+    """
+    simulator = build_simulator()
+    signal_cache = SignalCache()
+    with mock.patch.object(datahandler_module, 'fingerprint_data',
+                           wraps=datahandler_module.fingerprint_data) as fingerprint:
+        for long_window in (2, 3, 2, 3):
+            strategy = MovingAverageCrossStrategy(None, None, 1, long_window)
+            signal_cache.get_signals(strategy, simulator.datahandler)
+    assert fingerprint.call_count == 1
+    assert (signal_cache.hits, signal_cache.misses) == (2, 2)
@@ -0,0 +1,49 @@
+"""Test the streaming performance metrics against the equity curve
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_testing.analytics.performance_metrics import sharpe_ratio
+from quant_testing.analytics.streaming_metrics import RunningMoments
+
+
+def test_running_moments():
+    values = [3.0, -1.0, 4.0, 1.5, -5.0]
+    moments = RunningMoments()
+    for value in values:
+        moments.update(value)
+    assert moments.mean == pytest.approx(np.mean(values))
+    assert moments.variance == pytest.approx(np.var(values, ddof=1))
+
+
+def test_metrics_match_equity_curve(mock_data, build_simulator):
+    simulator = build_simulator()
+    eq_curve = simulator.backtest(pd.Timestamp(mock_data[-1, 0]))
+    metrics = simulator.metrics.summary()
+
+    returns = eq_curve['daily_return']
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    assert metrics['periods'] == len(eq_curve)
+    assert metrics['sharpe_ratio'] == pytest.approx(sharpe_ratio(eq_curve, 'daily_return'))
+    assert metrics['sortino_ratio'] == pytest.approx(np.sqrt(252) * returns.mean() / downside)
+    assert metrics['max_drawdown'] == pytest.approx(eq_curve['drawdown'].max())
+    assert metrics['total_return'] == pytest.approx(eq_curve['total_return'].iloc[-1])
+    assert metrics['fills'] == simulator.fill_count > 0
+    assert metrics['commission'] == pytest.approx(simulator.cumulative_comission)
+    assert metrics['round_trips'] > 0
+
+
+def test_run_metrics_without_history(mock_data, build_simulator):
+    finish = pd.Timestamp(mock_data[-1, 0])
+    expected = build_simulator().run_metrics(finish)
+
+    simulator = build_simulator(keep_history=False)
+    assert simulator.run_metrics(finish) == expected
+    assert simulator.returns == []
+
+
+def test_backtest_without_history(mock_data, build_simulator):
+    simulator = build_simulator(keep_history=False)
+    with pytest.raises(ValueError):
+        simulator.backtest(pd.Timestamp(mock_data[-1, 0]))
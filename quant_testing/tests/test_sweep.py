@@ -0,0 +1,93 @@
+"""Test the successive halving sweep scheduler
+"""
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_testing.core.sweep import SuccessiveHalving, geometric_milestones
+
+
+def test_geometric_milestones():
+    dates = pd.date_range('2017-01-01', periods=16)
+    assert geometric_milestones(dates, 3) == [dates[3], dates[7], dates[15]]
+    assert geometric_milestones(dates[:2], 3) == [dates[0], dates[1]]
+
+
+def test_successive_halving(mock_data, build_simulator):
+    """ Test that candidates are pruned each rung, and survivors continue their simulation
+    """
+    built = []
+
+    def build_candidate(params):
+        simulator = build_simulator(params)
+        built.append(simulator)
+        return simulator
+
+    candidates = [{'short_window': 1, 'long_window': long_window} for long_window in range(2, 6)]
+    dates = pd.to_datetime(mock_data[:, 0])
+    milestones = geometric_milestones(dates, 3)
+    scores = {2: 3., 3: 1., 4: 4., 5: 2.}
+
+    sweep = SuccessiveHalving(build_candidate, candidates, milestones)
+    with mock.patch.object(sweep, '_score',
+                           lambda simulator, eq_curve: scores[simulator.strategy.long_window]):
+        results = sweep.run()
+
+    assert len(built) == 4
+    assert [result.params['long_window'] for result in results] == [4, 2, 5, 3]
+    assert [result.finish for result in results] == [dates[-1], milestones[1],
+                                                     milestones[0], milestones[0]]
+
+    # The winner ran once over the whole history, continuing between rungs
+    winner = next(simulator for simulator in built if simulator.strategy.long_window == 4)
+    assert [row[0] for row in winner.returns] == list(dates[:-1])
+
+
+@pytest.mark.parametrize("max_drawdown", [None, 0.002])
+def test_sweep_without_history(mock_data, build_simulator, max_drawdown):
+    """ Test that simulators without an equity curve are scored on their streaming metrics
+    """
+    candidates = [{'short_window': 1, 'long_window': long_window} for long_window in range(2, 6)]
+    milestones = geometric_milestones(pd.to_datetime(mock_data[:, 0]), 3)
+
+    def run(keep_history):
+        sweep = SuccessiveHalving(lambda params: build_simulator(params, keep_history=keep_history),
+                                  candidates, milestones, max_drawdown=max_drawdown)
+        return sweep.run()
+
+    expected = run(keep_history=True)
+    results = run(keep_history=False)
+    assert [result.eq_curve for result in results] == [None] * len(candidates)
+    assert ([(result.params, result.finish, result.stopped_early) for result in results]
+            == [(result.params, result.finish, result.stopped_early) for result in expected])
+    np.testing.assert_allclose([result.score for result in results],
+                               [result.score for result in expected])
+
+
+def test_drawdown_early_stopping(mock_data, build_simulator):
+    simulator = build_simulator()
+
+    simulator._run_simulation(pd.Timestamp(mock_data[-1, 0]), max_drawdown=0)
+    assert simulator.stopped_early
+    assert simulator.metrics.drawdown.drawdown > 0
+    assert simulator.datahandler.current_timestamp < pd.Timestamp(mock_data[-1, 0])
+
+
+def test_stopped_candidates_eliminated(mock_data, build_simulator):
+    """ Test that a stopped candidate is not kept over a live one with the same score
+    """
+    def build_candidate(params):
+        simulator = build_simulator(params)
+        simulator.stopped_early = params['long_window'] == 2
+        return simulator
+
+    candidates = [{'short_window': 1, 'long_window': long_window} for long_window in (2, 3)]
+    dates = pd.to_datetime(mock_data[:, 0])
+    sweep = SuccessiveHalving(build_candidate, candidates, geometric_milestones(dates, 2))
+    with mock.patch.object(sweep, '_score', lambda simulator, eq_curve: -np.inf):
+        results = sweep.run()
+
+    assert [result.params['long_window'] for result in results] == [3, 2]
+    assert [result.stopped_early for result in results] == [False, True]
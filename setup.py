@@ -1,8 +1,12 @@
+import re
 from distutils.core import setup
 
+with open('quant_testing/__init__.py') as init_file:
+    version = re.search(r"^__version__ = '(.+)'$", init_file.read(), re.M).group(1)
+
 setup(
     name='quant-backtest',
-    version='0.1dev',
+    version=version,
     packages=['quant_testing',],
     license='Creative Commons Attribution-Noncommercial-Share Alike license',
     long_description=open('README.md').read(),